@@ -0,0 +1,102 @@
+"""
+*-------------------------------------------------------------------------------------
+*                    #### MACHINERY PROBLEM - MATRIX FORM ####
+**------------------------------------------------------------------------------------
+
+  Same model as machinery_problem.py, built from NumPy arrays with
+  matrix_model.py instead of rule functions:
+
+      max  profit x   s.t.  time_x_section' x <= max_time,  x integer >= 1
+
+  With --benchmark, a production-planning version of the model (many
+  products and sections, random data) is also built both ways and the
+  build times are compared.
+
+  Usage:
+      python machinery_matrix.py
+      python machinery_matrix.py --benchmark [products] [sections]
+
+"""
+
+
+import os
+import sys
+import time
+
+import numpy as np
+from pyomo.environ import *
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from matrix_model import linear_constraints, linear_objective
+from solver_memoria import crear_solver_en_memoria
+
+
+""" # 01 # Data of machinery_problem.py as arrays (rows: sections, columns: machinery)"""
+machinery = ['m1', 'm2', 'm3', 'm4']
+sections  = ['s1', 's2', 's3']
+
+profit   = np.array([12, 8, 12, 17])
+max_time = np.array([960, 1110, 400])
+
+time_x_section = np.array([[6, 4, 4, 8],
+                           [3, 3, 6, 9],
+                           [2, 1, 2, 1]])
+
+
+""" # 02 # Model"""
+m = ConcreteModel()
+
+M = m.M = Set(initialize = machinery, ordered = True)
+S = m.S = Set(initialize = sections, ordered = True)
+
+x = m.x = Var( M, within = PositiveIntegers )
+
+m.value      = linear_objective(profit, x, sense = maximize)
+m.constraint = linear_constraints(time_x_section, x, S, ub = max_time)
+
+crear_solver_en_memoria(alternativa = 'glpk').solve(m, tee = True)
+
+m.pprint()
+
+
+""" # 03 # Production planning: build time with rules and in matrix form"""
+def build_with_rules(T, p, cap):
+	m = ConcreteModel()
+	m.M = Set(initialize = range(T.shape[1]), ordered = True)
+	m.S = Set(initialize = range(T.shape[0]), ordered = True)
+	m.x = Var(m.M, within = NonNegativeReals)
+	t = {(i, j): T[j, i] for j in m.S for i in m.M}
+	m.value = Objective(expr = sum(p[i] * m.x[i] for i in m.M), sense = maximize)
+	def constraint_rule(m, j):
+		return sum(t[i, j] * m.x[i] for i in m.M) <= cap[j]
+	m.constraint = Constraint(m.S, rule = constraint_rule)
+	return m
+
+
+def build_matrix(T, p, cap):
+	m = ConcreteModel()
+	m.M = Set(initialize = range(T.shape[1]), ordered = True)
+	m.S = Set(initialize = range(T.shape[0]), ordered = True)
+	m.x = Var(m.M, within = NonNegativeReals)
+	m.value = linear_objective(p, m.x, sense = maximize)
+	m.constraint = linear_constraints(T, m.x, m.S, ub = cap)
+	return m
+
+
+def compare_build(n_products, n_sections):
+	rng = np.random.default_rng(0)
+	T   = rng.integers(1, 10, size = (n_sections, n_products)) * (rng.random((n_sections, n_products)) < 0.3)
+	p   = rng.integers(5, 20, size = n_products)
+	cap = T.sum(axis = 1) * 0.1
+
+	print('\nProduction planning: {0} products x {1} sections'.format(n_products, n_sections))
+	for name, build in [('rules', build_with_rules), ('matrix', build_matrix)]:
+		start = time.perf_counter()
+		build(T, p, cap)
+		print('  build with {0:7s} {1:8.2f} s'.format(name, time.perf_counter() - start))
+
+
+if __name__ == '__main__' and '--benchmark' in sys.argv[1:]:
+	sizes = [int(arg) for arg in sys.argv[1:] if arg != '--benchmark']
+	compare_build(sizes[0] if len(sizes) > 0 else 2000,
+	              sizes[1] if len(sizes) > 1 else 200)
@@ -21,7 +21,14 @@
 	to maximize profit.
 """
 
+import os
+import sys
 from pyomo.environ import *
+
+# In-memory solver (parent folder)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from solver_memoria import crear_solver_en_memoria
+
 m = ConcreteModel()
 
 M = m.M = Set(initialize =  ['m1', 'm2', 'm3', 'm4'], ordered = True)
@@ -47,6 +54,7 @@ def constraint_rule(m, j):
 m.constraint = Constraint(S, rule = constraint_rule) 
 						  						  
 
-SolverFactory('glpk').solve(m, tee = True)
+# HiGHS in memory (no LP file, no glpsol process), or glpk if HiGHS is not installed
+crear_solver_en_memoria(alternativa = 'glpk').solve(m, tee = True)
 
-m.pprint()
\ No newline at end of file
+m.pprint()
\ No newline at end of file
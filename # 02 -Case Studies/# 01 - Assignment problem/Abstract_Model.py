@@ -3,8 +3,14 @@
 # ======================================================================= #
 
 import logging
+import os
+import sys
 from pyomo.environ import *
 
+# Solver en memoria (carpeta superior)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from solver_memoria import solver_en_memoria
+
 '''
 En ocasiones, puede ser útil dejar un modelo abstracto definido. De esa 
 manera, con un rápido cambio de archivo de input, es posible darle distintos
@@ -60,13 +66,19 @@ m.OBJ = Objective(rule=fobj, sense=maximize)
 
 ## DATA
 # HAy que añadir los datos, claro.
-inst = m.create_instance(data = 'Abstract_Data.dat')
+# Con el archivo .dat de siempre:
+#   inst = m.create_instance(data = 'Abstract_Data.dat')
+# Para matrices grandes es mucho más rápido cargar los datos de un .csv, .npy
+# o .npz y pasar el diccionario directamente (ver cargar_datos.py)
+from cargar_datos import datos_asignacion
+inst = m.create_instance(data = datos_asignacion('Abstract_Data.csv'))
 inst.pprint()
 ## VERBATIM DE RESOLUCIÓN
-from pyomo.opt import SolverFactory
-opt = SolverFactory('glpk')
-results = opt.solve(inst)
+# Algoritmo húngaro, o MILP (HiGHS en memoria o glpk) si el modelo no es una
+# asignación pura
+from hungaro import resolver_asignacion
+results = resolver_asignacion(inst, motor = 'hungaro', solver = solver_en_memoria(alternativa = 'glpk'))
 results.write() 
 
 for i in inst.y:
-    print(i, ' :', inst.y[i].value)
\ No newline at end of file
+    print(i, ' :', inst.y[i].value)
\ No newline at end of file
@@ -2,9 +2,16 @@
 #                     ASSIGNATION PROBLEM                             #
 # ======================================================================= #
 
-import logging
+import os
+import sys
 from pyomo.environ import *
 
+# Funciones comunes de registro y exportación de resultados (carpeta superior)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from registro import crear_logger, archivar
+from exportar import exportar_resultados
+from solver_memoria import solver_en_memoria
+
 '''
 * Source: Grado Ingeniería Química. Universidad de Alicante.
           Asignatura: Simulaicón, optimización y diseño de procesos químicos
@@ -69,9 +76,12 @@ def fobj(m):
 OBJ = m.OBJ = Objective(rule=fobj, sense=maximize)
 
 ## VERBATIM DE RESOLUCIÓN
-from pyomo.opt import SolverFactory
-opt = SolverFactory('glpk')
-results = opt.solve(m)
+# El modelo es una asignación pura, así que se resuelve con el algoritmo
+# húngaro. Si tuviera restricciones adicionales se resolvería el MILP con HiGHS
+# en memoria (o con glpk si HiGHS no está instalado)
+# (motor='milp' lo fuerza siempre)
+from hungaro import resolver_asignacion
+results = resolver_asignacion(m, motor='hungaro', solver=solver_en_memoria(alternativa='glpk'))
 results.write()
 
 
@@ -96,29 +106,8 @@ a = R2['Contable'].expr
 print(a)
 
 ## LOGGING DE RESULTADOS
-# Se crea el logger y se da el nivel
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-# Se crea el formateador
-formatter = logging.Formatter('%(message)s')
-# Se crea lo que tratará el archivo y se le asigna el formateador
-file_handler = logging.FileHandler('Assignment.log', mode='w')
-file_handler.setFormatter(formatter)
-# Se empieza a añadir cosas
-logger.addHandler(file_handler)
-
-
-# Creamos una función para acelerarlo:
-def archivar(x, tipo='constraint'):
-    parrafo = '\n{0}: {1} ----------------\n'.format(x, x.doc)
-    for i in x:
-        if tipo == 'constraint':
-            parrafo += '\n{0}'.format(x[i].expr)
-        elif tipo == 'parameter':
-            parrafo += '\n{0} = {1}'.format(i, x[i])
-        elif tipo == 'variable':
-            parrafo += '\n{0} = {1}'.format(i, x[i].value)
-    return parrafo
+# Se crea el logger. Las componentes se escriben línea a línea en el archivo
+logger = crear_logger(__name__, 'Assignment.log')
 
 
 
@@ -136,7 +125,7 @@ logger.info('\n============== PARAMETERS ==============')
 # logger.info('\nCI: {0} --------------\n'.format(CI.doc))
 # for i in CI:
 #     logger.info('{0}, {1} = {2}'.format(i[0], i[1], CI[i]))
-logger.info(archivar(CI, tipo='parameter'))
+archivar(logger, CI, tipo='parameter')
 logger.info('========================================')
 logger.info('\n============== CONSTRAINTS ==============')
 # logger.info('\nR1: {0} --------------\n'.format(R1.doc))
@@ -145,9 +134,16 @@ logger.info('\n============== CONSTRAINTS ==============')
 # logger.info('\nR2: {0} --------------\n'.format(R2.doc))
 # for i in R2:
 #     logger.info(R2[i].expr)
-logger.info(archivar(R1))
-logger.info(archivar(R2))
+archivar(logger, R1)
+archivar(logger, R2)
 logger.info('=========================================')
 logger.info('\n==================================== VARIABLES ====================================')
-logger.info(archivar(y, tipo='variable'))
+archivar(logger, y, tipo='variable')
 logger.info('===================================================================================')
+
+
+## EXPORTACIÓN DE RESULTADOS
+# Valores de variables y restricciones en un archivo columnar (.npz)
+# El modelo es entero, así que no tiene duales ni costes reducidos: no se
+# declaran los sufijos m.dual y m.rc y las columnas 'dual' y 'rc' quedan a NaN.
+exportar_resultados(m, __file__[:-3] + '_Resultados.npz')
@@ -0,0 +1,59 @@
+# ======================================================================= #
+#                     CARGA RÁPIDA DE DATOS                               #
+# ======================================================================= #
+import itertools
+import numpy as np
+
+'''
+Con matrices de idoneidad grandes, leer el archivo .dat de estilo AMPL es más
+lento que resolver el modelo. Estas funciones leen p, t y CI de un archivo
+binario o columnar y devuelven directamente el diccionario de datos que
+acepta create_instance:
+
+    {None: {'p': {None: [...]}, 't': {None: [...]}, 'CI': {(p, t): valor}}}
+
+Formatos admitidos:
+    - '.npz': arrays 'p', 't' y 'CI' (se crea con guardar_datos)
+    - '.npy': solo la matriz CI, abierta como memory-map. Las personas y los
+              trabajos se numeran 1..n
+    - '.csv': la misma tabla que en el .dat, con los trabajos en la primera
+              fila y las personas en la primera columna
+
+Uso:
+    from cargar_datos import datos_asignacion
+    inst = m.create_instance(data = datos_asignacion('Abstract_Data.csv'))
+'''
+
+
+def _diccionario(p, t, CI):
+    # El producto cartesiano sigue el orden de la matriz por filas
+    CI = np.asarray(CI)
+    if CI.shape != (len(p), len(t)):
+        raise ValueError('La matriz CI es de {0} y hay {1} personas y {2} trabajos'
+                         .format(CI.shape, len(p), len(t)))
+    return {None: {'p':  {None: p},
+                   't':  {None: t},
+                   'CI': dict(zip(itertools.product(p, t), CI.ravel().tolist()))}}
+
+
+def datos_asignacion(archivo):
+    if archivo.endswith('.npz'):
+        with np.load(archivo) as datos:
+            return _diccionario(datos['p'].tolist(), datos['t'].tolist(), datos['CI'])
+    if archivo.endswith('.npy'):
+        CI = np.load(archivo, mmap_mode = 'r')
+        return _diccionario(list(range(1, CI.shape[0] + 1)),
+                            list(range(1, CI.shape[1] + 1)), CI)
+    if archivo.endswith('.csv'):
+        # El lector de pandas (en C) es mucho más rápido que np.genfromtxt
+        import pandas as pd
+        df = pd.read_csv(archivo, index_col = 0, skipinitialspace = True)
+        return _diccionario(df.index.astype(str).tolist(),
+                            df.columns.astype(str).tolist(), df.to_numpy())
+    raise ValueError('Formato de datos no soportado: {0}'.format(archivo))
+
+
+def guardar_datos(archivo, p, t, CI):
+    # Guarda los datos en un .npz para las siguientes cargas
+    np.savez(archivo, p = np.asarray(p, dtype = str), t = np.asarray(t, dtype = str),
+             CI = np.asarray(CI))
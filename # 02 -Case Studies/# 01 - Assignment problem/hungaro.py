@@ -0,0 +1,154 @@
+# ======================================================================= #
+#                     ASIGNACIÓN CON EL ALGORITMO HÚNGARO                 #
+# ======================================================================= #
+import numpy as np
+from pyomo.environ import *
+from pyomo.opt import SolverFactory, SolverResults, SolverStatus, TerminationCondition
+from pyomo.repn import generate_standard_repn
+
+'''
+El problema de asignación puro (cada persona un trabajo y cada trabajo una
+persona) no necesita un MILP: el algoritmo húngaro lo resuelve en O(n^3)
+directamente sobre la matriz de coeficientes.
+
+resolver_asignacion(m) comprueba si el modelo tiene esa estructura:
+    - un único objetivo lineal
+    - variables binarias (o con cotas 0 y 1)
+    - solo restricciones de igualdad sum(y) == 1 con coeficientes 1
+    - cada variable aparece en exactamente dos restricciones, una de cada
+      lado de la asignación (personas y trabajos)
+
+Si es así, construye la matriz de costes con NumPy, la resuelve con
+scipy.optimize.linear_sum_assignment y guarda la solución en las propias
+variables y, por lo que el objetivo y las restricciones se consultan igual
+que después de llamar al solver. En otro caso (restricciones adicionales,
+variables fijadas, scipy no instalado...) se resuelve el MILP con el solver
+indicado.
+
+Uso:
+    from hungaro import resolver_asignacion
+    results = resolver_asignacion(m)            # o motor = 'milp'
+    results.write()
+'''
+
+
+def _estructura(m):
+    # Devuelve (objetivo, variables, lado de cada restricción) o None si el
+    # modelo no es un problema de asignación puro
+    objetivos = list(m.component_data_objects(Objective, active = True))
+    if len(objetivos) != 1:
+        return None
+    obj = objetivos[0]
+    repn = generate_standard_repn(obj.expr, quadratic = False)
+    if not repn.is_linear():
+        return None
+
+    # > Cada variable debe quedar en exactamente dos restricciones
+    incidencia = {}
+    for r in m.component_data_objects(Constraint, active = True):
+        if not r.equality or value(r.upper) != 1:
+            return None
+        repn_r = generate_standard_repn(r.body, quadratic = False)
+        if not repn_r.is_linear() or repn_r.constant != 0 or not repn_r.linear_vars:
+            return None
+        for coef, var in zip(repn_r.linear_coefs, repn_r.linear_vars):
+            if coef != 1:
+                return None
+            incidencia.setdefault(id(var), (var, []))[1].append(r)
+    # Sin variables en las restricciones (por ejemplo, si todas las reglas
+    # devuelven Constraint.Skip) no hay matriz que asignar
+    if not incidencia:
+        return None
+
+    variables = [var for var, restricciones in incidencia.values()]
+    for var, restricciones in incidencia.values():
+        if len(restricciones) != 2 or var.fixed:
+            return None
+        if not (var.is_binary() or (var.is_integer() and var.lb == 0 and var.ub == 1)):
+            return None
+    if any(id(var) not in incidencia for var in repn.linear_vars):
+        return None
+
+    # > Las restricciones se separan en dos lados (grafo bipartito)
+    vecinos = {}
+    for var, (r1, r2) in incidencia.values():
+        vecinos.setdefault(id(r1), []).append(r2)
+        vecinos.setdefault(id(r2), []).append(r1)
+    lado = {}
+    for inicio in vecinos:
+        if inicio in lado:
+            continue
+        lado[inicio] = 0
+        pendientes = [inicio]
+        while pendientes:
+            r = pendientes.pop()
+            for rr in vecinos[r]:
+                if id(rr) not in lado:
+                    lado[id(rr)] = 1 - lado[r]
+                    pendientes.append(id(rr))
+                elif lado[id(rr)] == lado[r]:
+                    return None
+
+    return obj, repn, incidencia, variables, lado
+
+
+def _hungaro(m, estructura):
+    from scipy.optimize import linear_sum_assignment
+
+    obj, repn, incidencia, variables, lado = estructura
+    maximizar = obj.sense == maximize
+
+    # > Filas y columnas de la matriz: restricciones de cada lado
+    filas, columnas = {}, {}
+    celdas = []
+    for var, (r1, r2) in incidencia.values():
+        fila, columna = (r1, r2) if lado[id(r1)] == 0 else (r2, r1)
+        celdas.append((filas.setdefault(id(fila), len(filas)),
+                       columnas.setdefault(id(columna), len(columnas))))
+    if len(filas) != len(columnas):
+        return None
+
+    # > Los arcos que no existen quedan prohibidos (coste infinito)
+    C = np.full((len(filas), len(columnas)), -np.inf if maximizar else np.inf)
+    coste = {id(var): coef for coef, var in zip(repn.linear_coefs, repn.linear_vars)}
+    filas_v, columnas_v = np.array(celdas).T
+    C[filas_v, columnas_v] = [coste.get(id(var), 0) for var in variables]
+
+    try:
+        fila_sol, columna_sol = linear_sum_assignment(C, maximize = maximizar)
+    except ValueError:
+        return None      # no hay asignación completa; que lo diga el MILP
+
+    # > La solución se guarda en las variables del modelo
+    elegidas = set(zip(fila_sol.tolist(), columna_sol.tolist()))
+    for var, celda in zip(variables, celdas):
+        var.set_value(1 if celda in elegidas else 0)
+
+    valor = float(C[fila_sol, columna_sol].sum() + repn.constant)
+    results = SolverResults()
+    results.problem.name = m.name
+    results.problem.sense = obj.sense
+    results.problem.lower_bound = valor
+    results.problem.upper_bound = valor
+    results.problem.number_of_variables = len(variables)
+    results.problem.number_of_constraints = len(lado)
+    results.problem.number_of_objectives = 1
+    results.solver.name = 'hungarian (scipy.optimize.linear_sum_assignment)'
+    results.solver.status = SolverStatus.ok
+    results.solver.termination_condition = TerminationCondition.optimal
+    return results
+
+
+def resolver_asignacion(m, motor = 'hungaro', solver = 'glpk'):
+    if motor == 'hungaro':
+        estructura = _estructura(m)
+        if estructura is not None:
+            try:
+                results = _hungaro(m, estructura)
+            except ImportError:
+                results = None
+            if results is not None:
+                return results
+    # > Modelo general: se resuelve el MILP
+    opt = SolverFactory(solver)
+    return opt.solve(m)
@@ -1,9 +1,16 @@
 # ===================================================================== #
 #                     SET COVERING PROBLEM                              #
 # ===================================================================== #
-import logging
+import os
+import sys
 from pyomo.environ import *
 
+# Funciones comunes de registro y exportación de resultados (carpeta superior)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from registro import crear_logger, archivar
+from exportar import exportar_resultados
+from solver_memoria import solver_en_memoria
+
 '''
 * Source: Grado Ingeniería Química. Universidad de Alicante.
           Asignatura: Simulaicón, optimización y diseño de procesos químicos
@@ -31,12 +38,11 @@ Zonas = []
 [Zonas.append('Zona ' + str(i+1)) for i in range(12)]
 
 i = m.i = Set(initialize = Zonas, doc = 'Localizaciones', ordered = True)
-j = m.j = SetOf(m.i, doc = 'Alias de localizaciones', ordered = True)
+j = m.j = SetOf(m.i, doc = 'Alias de localizaciones')
 
 ## PARÁMETROS
-# El único parámetro para este problema es el que nos indica qué estaciones
-# dan servicio a qué zonas. Podemos crearlo a partir de un diccionario.
-v = {}
+# El único dato de este problema es qué estaciones dan servicio a qué zonas.
+# Podemos darlo con un diccionario.
 SZ = {'Zona 1': (1,2,3,5),
       'Zona 2': (1,2,5),
       'Zona 3': (1,3,4,5,6,7,8),
@@ -50,14 +56,19 @@ SZ = {'Zona 1': (1,2,3,5),
      'Zona 11': (4,5,6,8,9,10,11),
      'Zona 12': (7,8,9,12)}
 
-for s in SZ:
-    for ss in SZ[s]:
-        v[s,'Zona ' + str(ss)] = 1
-
-c = m.c = Param(m.j, m.i, initialize = v, default = 0,
-              doc = 'Estación i da servicio a zona j')
-# Esta es una de las posibilidades. Claramente hay varias más. Cada uno
-# que coja la que le sea más cómoda.
+# En lugar de una matriz zona x zona llena de ceros, para cada zona se
+# guardan solo las estaciones que le dan servicio (lista de adyacencia).
+# La memoria crece con el número de pares y no con el cuadrado de zonas.
+def vecinos(m, a):
+    return ['Zona ' + str(ss) for ss in SZ[a]]
+N = m.N = Set(m.j, within = m.i, initialize = vecinos, ordered = True,
+              doc = 'Estaciones i que dan servicio a la zona j')
+# Esta es una de las posibilidades. Claramente hay varias más (por ejemplo
+# un Param(m.j, m.i) con default = 0). Cada uno que coja la que le sea más
+# cómoda.
+# Con sitios reales (coordenadas de zonas y estaciones y un radio de
+# servicio) la tabla no se escribe a mano: cobertura_espacial.modelo_cobertura
+# busca las parejas con un índice espacial y crea estas mismas componentes.
 
 ## VARIABLES
 # Deben declararse las variables del modelo. En este caso, sólo existe
@@ -66,9 +77,9 @@ y = m.y = Var(m.i, within = Binary, doc = 'Existe una planta en i')
 
 ## RESTRICCIONES
 # Es necesario escribir las ecuaciones del modelo. En este caso, solo existe
-# una restricción.
+# una restricción. La suma recorre solo las estaciones vecinas de la zona.
 def r1(m, a):
-    return sum(c[a,b]*y[b] for b in i) >= 1
+    return sum(y[b] for b in N[a]) >= 1
 R1 = m.r1 = Constraint(j, rule = r1, doc = 'Satisfacción de demanda')
 
 ## FUNCIÓN OBJETIVO
@@ -78,35 +89,17 @@ def obj(m):
 OBJ = m.obj = Objective(rule = obj, sense = minimize, doc = 'Número de plantas')
 
 ## VERBATIM DE RESOLUCIÓN
-from pyomo.opt import SolverFactory
-opt = SolverFactory('glpk')
-results = opt.solve(m)
+# Antes del MILP se reduce el problema y se calculan una solución voraz y una
+# cota lagrangiana (cobertura.py). Solo lo que queda se resuelve con HiGHS en
+# memoria (o con glpk si HiGHS no está instalado)
+from cobertura import resolver_cobertura
+results = resolver_cobertura(m, motor = 'lagrangiano', solver = solver_en_memoria(alternativa = 'glpk'))
 results.write()
 
 
 ## LOGGING
-# Se crea el logger y se da el nivel
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-# Se crea el formateador
-formatter = logging.Formatter('%(message)s')
-# Se crea lo que tratará el archivo y se le asigna el formateador
-file_handler = logging.FileHandler(__file__[:-3] + '_Logging.log', mode='w')
-file_handler.setFormatter(formatter)
-# Se empieza a añadir cosas
-logger.addHandler(file_handler)
-
-# Creamos una función para acelerarlo:
-def archivar(x, tipo='constraint'):
-    parrafo = '\n{0}: {1} ----------------\n'.format(x, x.doc)
-    for i in x:
-        if tipo == 'constraint':
-            parrafo += '\n{0}'.format(x[i].expr)
-        elif tipo == 'parameter':
-            parrafo += '\n{0} = {1}'.format(i, x[i])
-        elif tipo == 'variable':
-            parrafo += '\n{0} = {1}'.format(i, x[i].value)
-    return parrafo
+# Se crea el logger. Las componentes se escriben línea a línea en el archivo
+logger = crear_logger(__name__, __file__[:-3] + '_Logging.log')
 
 logger.info(results)
 logger.info('\n========== OBJECTIVE FUNCTION ==========')
@@ -115,12 +108,18 @@ logger.info('\nEl valor de la función objetivo es: ')
 logger.info(OBJ.expr())
 logger.info('========================================')
 logger.info('\n============== PARAMETERS ==============')
-logger.info(archivar(c, tipo='parameter'))
+archivar(logger, N, tipo='set')
 logger.info('========================================')
 logger.info('\n============== CONSTRAINTS ==============')
-logger.info(archivar(R1))
+archivar(logger, R1)
 logger.info('=========================================')
 logger.info('\n==================================== VARIABLES ====================================')
-logger.info(archivar(y, tipo='variable'))
+archivar(logger, y, tipo='variable')
 logger.info('===================================================================================')
 
+
+## EXPORTACIÓN DE RESULTADOS
+# Valores de variables y restricciones en un archivo columnar (.npz)
+# El modelo es entero, así que no tiene duales ni costes reducidos: no se
+# declaran los sufijos m.dual y m.rc y las columnas 'dual' y 'rc' quedan a NaN.
+exportar_resultados(m, __file__[:-3] + '_Resultados.npz')
@@ -0,0 +1,333 @@
+# ===================================================================== #
+#                     SET COVERING: REDUCCIONES Y LAGRANGIANO           #
+# ===================================================================== #
+import heapq
+import math
+import numpy as np
+from pyomo.environ import *
+from pyomo.opt import SolverFactory, SolverResults, SolverStatus, TerminationCondition
+from pyomo.repn import generate_standard_repn
+
+'''
+Con miles de zonas el MILP del set covering tal cual no termina. Antes de
+llamar al solver el problema se reduce y se acota:
+
+    - Reducciones (se repiten mientras haya cambios):
+        * una zona que solo cubre una estación obliga a poner esa estación
+        * una zona cuyas estaciones contienen a las de otra zona sobra (al
+          cubrir la otra queda cubierta)
+        * una estación cuyas zonas están contenidas en las de otra estación
+          igual o más barata sobra
+    - Solución voraz (Chvátal): se elige la estación con menor coste por
+      zona nueva cubierta y al final se quitan las que sobran.
+    - Cota lagrangiana: se relajan las restricciones de cobertura con
+      multiplicadores u >= 0 que se ajustan por subgradiente. Las estaciones
+      cuyo coste reducido lleva la cota por encima de la solución voraz no
+      pueden estar en una solución mejor y se quitan.
+    - Si la cota alcanza la solución voraz, ésta es óptima. Si no, el MILP
+      se resuelve solo con las zonas y estaciones que quedan (el núcleo),
+      con la solución voraz como solución inicial (warmstart) si el solver
+      lo admite o como cota del objetivo si no.
+
+La matriz de cobertura (zonas x estaciones) se guarda como matriz dispersa
+CSR de scipy.
+
+resolver_cobertura(m) reconoce el set covering en el modelo:
+    - objetivo lineal a minimizar con costes >= 0
+    - variables binarias
+    - restricciones sum(a * y) >= b con b > 0 y coeficientes a >= b (cada
+      estación basta para cubrir la zona)
+y guarda la solución en las variables y. En otro caso, o si scipy no está
+instalado, se resuelve el MILP con el solver indicado.
+
+Uso:
+    from cobertura import resolver_cobertura
+    results = resolver_cobertura(m)            # o motor = 'milp'
+    results.write()
+'''
+
+
+def reducir(A, c):
+    '''
+    A: matriz de cobertura CSR (zonas x estaciones). c: coste de las estaciones.
+    Devuelve (zonas que quedan, estaciones que quedan, estaciones forzadas)
+    como vectores booleanos, o None si hay una zona que nadie cubre.
+    '''
+    At = A.T.tocsr()
+    zonas = [set(A.indices[A.indptr[r]:A.indptr[r + 1]].tolist()) for r in range(A.shape[0])]
+    estaciones = [set(At.indices[At.indptr[k]:At.indptr[k + 1]].tolist()) for k in range(A.shape[1])]
+    zona_viva = np.ones(A.shape[0], dtype = bool)
+    estacion_viva = np.ones(A.shape[1], dtype = bool)
+    forzada = np.zeros(A.shape[1], dtype = bool)
+
+    def quitar_zona(r):
+        zona_viva[r] = False
+        for k in zonas[r]:
+            estaciones[k].discard(r)
+
+    def quitar_estacion(k):
+        estacion_viva[k] = False
+        for r in estaciones[k]:
+            zonas[r].discard(k)
+
+    def forzar(k):
+        forzada[k] = True
+        for r in list(estaciones[k]):
+            quitar_zona(r)
+        quitar_estacion(k)
+
+    cambios = True
+    while cambios:
+        cambios = False
+
+        # > Zonas con una sola estación
+        for r in np.flatnonzero(zona_viva):
+            if not zona_viva[r]:
+                continue
+            if not zonas[r]:
+                return None
+            if len(zonas[r]) == 1:
+                forzar(next(iter(zonas[r])))
+                cambios = True
+
+        # > Estaciones sin zonas que cubrir
+        for k in np.flatnonzero(estacion_viva):
+            if not estaciones[k]:
+                estacion_viva[k] = False
+
+        # > Zonas dominadas: las estaciones de r están todas en s
+        for r in sorted(np.flatnonzero(zona_viva), key = lambda r: len(zonas[r])):
+            if not zona_viva[r]:
+                continue
+            k0 = min(zonas[r], key = lambda k: len(estaciones[k]))
+            for s in list(estaciones[k0]):
+                if s != r and len(zonas[s]) >= len(zonas[r]) and zonas[r] <= zonas[s]:
+                    quitar_zona(s)
+                    cambios = True
+
+        # > Estaciones dominadas: las zonas de k están en las de otra no más cara
+        for k in sorted(np.flatnonzero(estacion_viva), key = lambda k: len(estaciones[k])):
+            if not estaciones[k]:
+                continue
+            r0 = min(estaciones[k], key = lambda r: len(zonas[r]))
+            for l in zonas[r0]:
+                if l != k and c[l] <= c[k] and estaciones[k] <= estaciones[l]:
+                    quitar_estacion(k)
+                    cambios = True
+                    break
+
+    return zona_viva, estacion_viva, forzada
+
+
+def voraz(A, c):
+    # Chvátal: menor coste por zona nueva cubierta. Montículo con los
+    # cocientes desactualizados, que se recalculan al sacarlos
+    At = A.T.tocsr()
+    nuevas = np.diff(At.indptr).astype(float)
+    cubierta = np.zeros(A.shape[0], dtype = bool)
+    elegida = np.zeros(A.shape[1], dtype = bool)
+    monticulo = [(c[k] / nuevas[k], k) for k in range(A.shape[1]) if nuevas[k] > 0]
+    heapq.heapify(monticulo)
+    while monticulo and not cubierta.all():
+        cociente, k = heapq.heappop(monticulo)
+        if nuevas[k] == 0:
+            continue
+        if cociente < c[k] / nuevas[k]:
+            heapq.heappush(monticulo, (c[k] / nuevas[k], k))
+            continue
+        elegida[k] = True
+        for r in At.indices[At.indptr[k]:At.indptr[k + 1]]:
+            if not cubierta[r]:
+                cubierta[r] = True
+                nuevas[A.indices[A.indptr[r]:A.indptr[r + 1]]] -= 1
+
+    # > Se quitan las estaciones cuyas zonas ya cubren otras (las caras primero)
+    veces = A @ elegida.astype(float)
+    for k in sorted(np.flatnonzero(elegida), key = lambda k: -c[k]):
+        zonas_k = At.indices[At.indptr[k]:At.indptr[k + 1]]
+        if (veces[zonas_k] >= 2).all():
+            elegida[k] = False
+            veces[zonas_k] -= 1
+    return elegida
+
+
+def cota_lagrangiana(A, c, cota_superior, iteraciones = 500):
+    # Subgradiente sobre L(u) = sum(u) + sum(min(0, c - A'u)). Devuelve la
+    # mejor cota y sus costes reducidos
+    At = A.T.tocsr()
+    tamano = np.diff(At.indptr)
+    u = np.array([np.min(c[A.indices[A.indptr[r]:A.indptr[r + 1]]] /
+                         tamano[A.indices[A.indptr[r]:A.indptr[r + 1]]])
+                  for r in range(A.shape[0])])
+    mejor, mejor_reducidos = -np.inf, c.copy()
+    paso, sin_mejora = 2.0, 0
+    for iteracion in range(iteraciones):
+        reducidos = c - At @ u
+        x = reducidos < 0
+        L = u.sum() + reducidos[x].sum()
+        if L > mejor + 1e-9:
+            mejor, mejor_reducidos, sin_mejora = L, reducidos, 0
+        else:
+            sin_mejora += 1
+            if sin_mejora >= 20:
+                paso, sin_mejora = paso / 2, 0
+        g = 1 - A @ x.astype(float)
+        g[(u <= 0) & (g < 0)] = 0
+        norma = g @ g
+        if norma == 0 or paso < 1e-4 or cota_superior - mejor < 1e-6:
+            break
+        u = np.maximum(0, u + paso * (cota_superior - L) / norma * g)
+    return mejor, mejor_reducidos
+
+
+def _estructura(m):
+    # Devuelve (objetivo, variables, matriz CSR, costes) o None si el modelo
+    # no es un set covering
+    from scipy.sparse import csr_matrix
+
+    objetivos = list(m.component_data_objects(Objective, active = True))
+    if len(objetivos) != 1 or objetivos[0].sense != minimize:
+        return None
+    repn = generate_standard_repn(objetivos[0].expr, quadratic = False)
+    if not repn.is_linear() or any(coef < 0 for coef in repn.linear_coefs):
+        return None
+
+    variables, posicion = [], {}
+    for var in repn.linear_vars:
+        if id(var) not in posicion:
+            posicion[id(var)] = len(variables)
+            variables.append(var)
+    indptr, indices = [0], []
+    for r in m.component_data_objects(Constraint, active = True):
+        if r.has_ub() or not r.has_lb():
+            return None
+        repn_r = generate_standard_repn(r.body, quadratic = False)
+        if not repn_r.is_linear():
+            return None
+        limite = value(r.lower) - repn_r.constant
+        if limite <= 0:
+            return None
+        for coef, var in zip(repn_r.linear_coefs, repn_r.linear_vars):
+            if coef < limite:
+                return None
+            if id(var) not in posicion:
+                posicion[id(var)] = len(variables)
+                variables.append(var)
+            indices.append(posicion[id(var)])
+        indptr.append(len(indices))
+    if not indices:
+        return None
+    for var in variables:
+        if var.fixed or not (var.is_binary() or (var.is_integer() and var.lb == 0 and var.ub == 1)):
+            return None
+
+    coste = {id(var): coef for coef, var in zip(repn.linear_coefs, repn.linear_vars)}
+    c = np.array([coste.get(id(var), 0) for var in variables], dtype = float)
+    A = csr_matrix((np.ones(len(indices)), indices, indptr), shape = (len(indptr) - 1, len(variables)))
+    A.sum_duplicates()
+    A.data[:] = 1
+    return repn, variables, A, c
+
+
+def _nucleo(A, c, inicial, cota, solver, **kwargs):
+    # MILP con las zonas y estaciones que quedan. Devuelve la solución o None
+    At = A.T.tocsr()
+    nucleo = ConcreteModel(name = 'Nucleo del set covering')
+    nucleo.i = Set(initialize = range(A.shape[0]))
+    nucleo.j = Set(initialize = range(A.shape[1]))
+    nucleo.y = Var(nucleo.j, within = Binary, initialize = lambda n, k: int(inicial[k]))
+    nucleo.r1 = Constraint(nucleo.i, rule = lambda n, r:
+                           sum(n.y[k] for k in A.indices[A.indptr[r]:A.indptr[r + 1]].tolist()) >= 1)
+    nucleo.obj = Objective(expr = sum(float(c[k]) * nucleo.y[k] for k in nucleo.j), sense = minimize)
+
+    opt = SolverFactory(solver)
+    if opt.available(exception_flag = False) and opt.warm_start_capable():
+        kwargs.setdefault('warmstart', True)
+    else:
+        nucleo.cota = Constraint(expr = nucleo.obj.expr <= cota)
+    results = opt.solve(nucleo, load_solutions = False, **kwargs)
+    if results.solver.termination_condition == TerminationCondition.infeasible or \
+            len(results.solution) == 0:
+        return None, results
+    nucleo.solutions.load_from(results)
+    return np.array([value(nucleo.y[k]) > 0.5 for k in nucleo.j]), results
+
+
+def _cobertura(m, estructura, solver, **kwargs):
+    repn, variables, A, c = estructura
+    reducido = reducir(A, c)
+    if reducido is None:
+        return None      # hay zonas sin cubrir; que lo diga el MILP
+    zonas, estaciones, forzadas = reducido
+    fijo = float(c[forzadas].sum())
+    y = forzadas.copy()
+    terminacion = TerminationCondition.optimal
+    inferior = superior = 0
+    nombre = 'set covering (reducciones, voraz y cota lagrangiana)'
+
+    if zonas.any():
+        # > Problema reducido: voraz y cota lagrangiana
+        B = A[zonas][:, estaciones].tocsr()
+        cB = c[estaciones]
+        elegida = voraz(B, cB)
+        superior = float(cB[elegida].sum())
+        L, reducidos = cota_lagrangiana(B, cB, superior)
+        enteros = all(coef == int(coef) for coef in cB)
+        inferior = math.ceil(L - 1e-6) if enteros else L
+
+        # > Fuera las estaciones que no pueden mejorar la solución voraz
+        cota_j = L + np.maximum(reducidos, 0)
+        if enteros:
+            cota_j = np.ceil(cota_j - 1e-6)
+        utiles = cota_j < superior - 1e-9
+
+        if inferior < superior - 1e-9 and (B[:, utiles].getnnz(axis = 1) > 0).all():
+            # > MILP del núcleo, con la solución voraz como solución inicial
+            N = B[:, utiles].tocsr()
+            solucion, results_nucleo = _nucleo(N, cB[utiles], elegida[utiles],
+                                               superior - 1 if enteros else superior,
+                                               solver, **kwargs)
+            nombre += ' + MILP del núcleo ({0} zonas x {1} estaciones)'.format(*N.shape)
+            terminacion = results_nucleo.solver.termination_condition
+            if terminacion == TerminationCondition.infeasible:
+                terminacion = TerminationCondition.optimal      # no hay nada mejor
+            if solucion is not None and cB[utiles][solucion].sum() < superior - 1e-9:
+                elegida = np.zeros(len(cB), dtype = bool)
+                elegida[np.flatnonzero(utiles)[solucion]] = True
+                superior = float(cB[elegida].sum())
+        if terminacion == TerminationCondition.optimal:
+            inferior = superior
+        y[np.flatnonzero(estaciones)[elegida]] = True
+
+    # > La solución se guarda en las variables del modelo
+    for var, valor in zip(variables, y.tolist()):
+        var.set_value(int(valor))
+
+    results = SolverResults()
+    results.problem.name = m.name
+    results.problem.sense = minimize
+    results.problem.lower_bound = fijo + inferior + repn.constant
+    results.problem.upper_bound = fijo + superior + repn.constant
+    results.problem.number_of_variables = A.shape[1]
+    results.problem.number_of_constraints = A.shape[0]
+    results.problem.number_of_objectives = 1
+    results.solver.name = nombre
+    results.solver.status = SolverStatus.ok if terminacion == TerminationCondition.optimal \
+                            else SolverStatus.warning
+    results.solver.termination_condition = terminacion
+    return results
+
+
+def resolver_cobertura(m, motor = 'lagrangiano', solver = 'glpk', **kwargs):
+    if motor == 'lagrangiano':
+        try:
+            estructura = _estructura(m)
+        except ImportError:
+            estructura = None
+        if estructura is not None:
+            results = _cobertura(m, estructura, solver, **kwargs)
+            if results is not None:
+                return results
+    # > Modelo general: se resuelve el MILP
+    opt = SolverFactory(solver)
+    return opt.solve(m, **kwargs)
@@ -0,0 +1,124 @@
+# ===================================================================== #
+#                     COBERTURA CON ÍNDICE ESPACIAL                     #
+# ===================================================================== #
+import numpy as np
+from pyomo.environ import *
+
+'''
+En Set_Covering.py la tabla SZ (qué estaciones dan servicio a cada zona) está
+escrita a mano a partir de SC.png. Con sitios reales se tienen coordenadas de
+las zonas y de las estaciones y un radio de servicio: una estación da
+servicio a una zona si está a una distancia menor o igual que el radio.
+
+Comprobar todas las parejas zona-estación cuesta O(n^2). Aquí las parejas se
+buscan con un índice espacial:
+    - 'kdtree':  scipy.spatial.cKDTree (cualquier dimensión, en paralelo)
+    - 'rejilla': cubetas cuadradas de lado igual al radio (solo NumPy, 2D).
+                 Cada zona solo mira las estaciones de su cubeta y de las 8
+                 de alrededor
+En los dos casos el coste es O(n log n) más el número de parejas.
+
+La cobertura se devuelve en formato CSR: las estaciones de la zona z son
+indices[indptr[z]:indptr[z + 1]], ordenadas.
+
+Uso:
+    from cobertura_espacial import modelo_cobertura
+    m = modelo_cobertura(zonas_xy, estaciones_xy, radio)
+    results = resolver_cobertura(m)            # cobertura.py
+
+modelo_cobertura crea las mismas componentes que Set_Covering.py: i
+(estaciones), j (zonas), N[j] (estaciones que dan servicio a la zona j), y,
+r1 y obj.
+'''
+
+
+def vecinos_radio(zonas_xy, estaciones_xy, radio, metodo = 'kdtree'):
+    zonas_xy = np.asarray(zonas_xy, dtype = float)
+    estaciones_xy = np.asarray(estaciones_xy, dtype = float)
+    if not radio > 0:
+        raise ValueError('El radio de servicio debe ser positivo, no {0}'.format(radio))
+    if metodo == 'kdtree':
+        try:
+            return _kdtree(zonas_xy, estaciones_xy, radio)
+        except ImportError:
+            metodo = 'rejilla'      # sin scipy se usan las cubetas
+    if metodo == 'rejilla':
+        return _rejilla(zonas_xy, estaciones_xy, radio)
+    raise ValueError("metodo debe ser 'kdtree' o 'rejilla', no {0!r}".format(metodo))
+
+
+def _kdtree(zonas_xy, estaciones_xy, radio):
+    from scipy.spatial import cKDTree
+
+    arbol = cKDTree(estaciones_xy)
+    listas = arbol.query_ball_point(zonas_xy, radio, return_sorted = True, workers = -1)
+    cuantos = np.fromiter(map(len, listas), dtype = np.int64, count = len(listas))
+    indptr = np.concatenate(([0], np.cumsum(cuantos)))
+    indices = np.fromiter((k for lista in listas for k in lista), dtype = np.int64, count = indptr[-1])
+    return indptr, indices
+
+
+def _rejilla(zonas_xy, estaciones_xy, radio):
+    if zonas_xy.shape[1] != 2 or estaciones_xy.shape[1] != 2:
+        raise ValueError("La rejilla es para coordenadas 2D; use metodo = 'kdtree'")
+
+    # > Cubeta de cada punto. Las estaciones se ordenan por cubeta
+    origen = np.minimum(zonas_xy.min(axis = 0), estaciones_xy.min(axis = 0))
+    celda_z = np.floor((zonas_xy - origen) / radio).astype(np.int64) + 1
+    celda_e = np.floor((estaciones_xy - origen) / radio).astype(np.int64) + 1
+    ancho = max(celda_z[:, 1].max(), celda_e[:, 1].max()) + 2
+    clave_e = celda_e[:, 0] * ancho + celda_e[:, 1]
+    orden = np.argsort(clave_e, kind = 'stable')
+    clave_e = clave_e[orden]
+
+    # > Para cada una de las 9 cubetas vecinas, candidatos y distancia
+    zonas, estaciones = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            clave = (celda_z[:, 0] + dx) * ancho + celda_z[:, 1] + dy
+            desde = np.searchsorted(clave_e, clave, side = 'left')
+            cuantos = np.searchsorted(clave_e, clave, side = 'right') - desde
+            total = cuantos.sum()
+            z = np.repeat(np.arange(len(zonas_xy)), cuantos)
+            k = orden[np.repeat(desde - np.cumsum(cuantos) + cuantos, cuantos) + np.arange(total)]
+            cerca = ((zonas_xy[z] - estaciones_xy[k]) ** 2).sum(axis = 1) <= radio ** 2
+            zonas.append(z[cerca])
+            estaciones.append(k[cerca])
+
+    zonas = np.concatenate(zonas)
+    estaciones = np.concatenate(estaciones)
+    orden = np.lexsort((estaciones, zonas))
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(zonas, minlength = len(zonas_xy)))))
+    return indptr, estaciones[orden]
+
+
+def modelo_cobertura(zonas_xy, estaciones_xy, radio, costes = None, metodo = 'kdtree',
+                     nombres_zonas = None, nombres_estaciones = None):
+    indptr, indices = vecinos_radio(zonas_xy, estaciones_xy, radio, metodo)
+    sin_servicio = np.flatnonzero(np.diff(indptr) == 0)
+    if len(sin_servicio):
+        raise ValueError('{0} zonas no tienen ninguna estación a menos de {1} (la primera, {2})'
+                         .format(len(sin_servicio), radio, sin_servicio[0]))
+
+    if nombres_zonas is None:
+        nombres_zonas = ['Zona ' + str(z + 1) for z in range(len(indptr) - 1)]
+    if nombres_estaciones is None:
+        nombres_estaciones = ['Estacion ' + str(k + 1) for k in range(len(estaciones_xy))]
+    if costes is None:
+        costes = np.ones(len(nombres_estaciones))
+    vecinos = {zona: [nombres_estaciones[k] for k in indices[indptr[z]:indptr[z + 1]]]
+               for z, zona in enumerate(nombres_zonas)}
+
+    m = ConcreteModel(name = 'Set covering')
+    i = m.i = Set(initialize = nombres_estaciones, doc = 'Estaciones', ordered = True)
+    j = m.j = Set(initialize = nombres_zonas, doc = 'Zonas', ordered = True)
+    N = m.N = Set(j, within = i, initialize = vecinos, ordered = True,
+                  doc = 'Estaciones i que dan servicio a la zona j')
+    coste = m.coste = Param(i, initialize = dict(zip(nombres_estaciones, np.asarray(costes).tolist())),
+                            doc = 'Coste de poner una planta en i')
+    y = m.y = Var(i, within = Binary, doc = 'Existe una planta en i')
+    m.r1 = Constraint(j, rule = lambda m, a: sum(y[b] for b in N[a]) >= 1,
+                      doc = 'Satisfacción de demanda')
+    m.obj = Objective(expr = sum(coste[b] * y[b] for b in i), sense = minimize,
+                      doc = 'Coste de las plantas')
+    return m
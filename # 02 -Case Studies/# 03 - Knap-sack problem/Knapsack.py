@@ -1,9 +1,16 @@
 # ===================================================================== #
 #                     KNAPS-SACK PROBLEM                                #
 # ===================================================================== #
-import logging
+import os
+import sys
 from pyomo.environ import *
 
+# Funciones comunes de registro y exportación de resultados (carpeta superior)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from registro import crear_logger, archivar
+from exportar import exportar_resultados
+from solver_memoria import solver_en_memoria
+
 '''
 * Source: Grado Ingeniería Química. Universidad de Alicante.
           Asignatura: Simulaicón, optimización y diseño de procesos químicos
@@ -96,11 +103,12 @@ def WeightRule(m):
 
 R2 = m.WeightRule = Constraint(rule=WeightRule, doc = 'Restricción de peso')
 
-# - No puedes coger mas objetos de los que hay
+# - No puedes coger mas objetos de los que hay, y solo se cogen los objetos
+#   elegidos (y[i] = 0 obliga a n[i] = 0)
 
 
 def NumberRule(m, i):
-    return n[i] <= N[i]
+    return n[i] <= N[i] * y[i]
 
 
 R3 = m.NumberRule = Constraint(obj, rule=NumberRule, doc = 'De donde no hay no se puede sacar')
@@ -118,9 +126,11 @@ def ObjFunc(m):
 OBJ = m.objective = Objective(rule=ObjFunc, sense=maximize, doc='Beneficio')
 
 ## VERBATIM DE RESOLUCIÓN
-from pyomo.opt import SolverFactory
-opt = SolverFactory('glpk')
-results = opt.solve(m)
+# La mochila se resuelve con programación dinámica (mochila_dp.py). Si el
+# modelo tuviese otras restricciones se resolvería el MILP con HiGHS en
+# memoria (o con glpk si HiGHS no está instalado)
+from mochila_dp import resolver_mochila
+results = resolver_mochila(m, motor='dp', solver=solver_en_memoria(alternativa='glpk'))
 results.write()
 
 ## LECTURA DE RESULTADOS
@@ -130,28 +140,8 @@ for i in obj:
 
 
 ## LOGGING
-# Se crea el logger y se da el nivel
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-# Se crea el formateador
-formatter = logging.Formatter('%(message)s')
-# Se crea lo que tratará el archivo y se le asigna el formateador
-file_handler = logging.FileHandler(__file__[:-3] + '_Logging.log', mode='w')
-file_handler.setFormatter(formatter)
-# Se empieza a añadir cosas
-logger.addHandler(file_handler)
-
-# Creamos una función para acelerarlo:
-def archivar(x, tipo='constraint'):
-    parrafo = '\n{0}: {1} ----------------\n'.format(x, x.doc)
-    for i in x:
-        if tipo == 'constraint':
-            parrafo += '\n{0}'.format(x[i].expr)
-        elif tipo == 'parameter':
-            parrafo += '\n{0} = {1}'.format(i, x[i])
-        elif tipo == 'variable':
-            parrafo += '\n{0} = {1}'.format(i, x[i].value)
-    return parrafo
+# Se crea el logger. Las componentes se escriben línea a línea en el archivo
+logger = crear_logger(__name__, __file__[:-3] + '_Logging.log')
 
 logger.info(results)
 logger.info('\n========== OBJECTIVE FUNCTION ==========')
@@ -160,16 +150,24 @@ logger.info('\nEl valor de la función objetivo es: ')
 logger.info(OBJ.expr())
 logger.info('========================================')
 logger.info('\n============== PARAMETERS ==============')
-logger.info(archivar(MP, tipo='parameter'))
-logger.info(archivar(V, tipo='parameter'))
-logger.info(archivar(W, tipo='parameter'))
-logger.info(archivar(N, tipo='parameter'))
+archivar(logger, MP, tipo='parameter')
+archivar(logger, V, tipo='parameter')
+archivar(logger, W, tipo='parameter')
+archivar(logger, N, tipo='parameter')
 logger.info('========================================')
 logger.info('\n============== CONSTRAINTS ==============')
-logger.info(archivar(R1))
-logger.info(archivar(R2))
-logger.info(archivar(R3))
+archivar(logger, R1)
+archivar(logger, R2)
+archivar(logger, R3)
 logger.info('=========================================')
 logger.info('\n==================================== VARIABLES ====================================')
-logger.info(archivar(n, tipo='variable'))
+archivar(logger, y, tipo='variable')
+archivar(logger, n, tipo='variable')
 logger.info('===================================================================================')
+
+
+## EXPORTACIÓN DE RESULTADOS
+# Valores de variables y restricciones en un archivo columnar (.npz)
+# El modelo es entero, así que no tiene duales ni costes reducidos: no se
+# declaran los sufijos m.dual y m.rc y las columnas 'dual' y 'rc' quedan a NaN.
+exportar_resultados(m, __file__[:-3] + '_Resultados.npz')
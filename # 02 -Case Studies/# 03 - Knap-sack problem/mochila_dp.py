@@ -0,0 +1,269 @@
+# ===================================================================== #
+#                     MOCHILA CON PROGRAMACIÓN DINÁMICA                 #
+# ===================================================================== #
+import math
+import numpy as np
+from pyomo.environ import *
+from pyomo.opt import SolverFactory, SolverResults, SolverStatus, TerminationCondition
+from pyomo.repn import generate_standard_repn
+
+'''
+La mochila acotada (cada objeto se puede coger entre 0 y N veces) con una o
+varias capacidades (volumen, peso, ...) se resuelve sin llamar al solver:
+
+    - Cota LP: para cada capacidad se resuelve la relajación lineal con el
+      algoritmo voraz (mejores precio/capacidad primero, el último objeto
+      fraccionado). La menor de todas es una cota superior del óptimo.
+    - Solución voraz: se cogen objetos por orden de precio frente a la
+      capacidad que consumen mientras quepan. Si alcanza la cota LP es óptima
+      y no hace falta nada más.
+    - Poda: no se cogen los objetos con los que la cota LP no mejora la
+      solución voraz.
+    - Programación dinámica: los objetos se dividen en potencias de 2
+      (1, 2, 4, ... unidades) y se recorre una tabla de NumPy con una
+      dimensión por capacidad. Cada objeto se añade a toda la tabla a la vez.
+      Los pesos y capacidades se dividen antes por su máximo común divisor.
+
+resolver_mochila(m) reconoce esa estructura en el modelo:
+    - objetivo lineal a maximizar con precios >= 0
+    - variables enteras no negativas
+    - restricciones de capacidad sum(w[i] * n[i]) <= W con w[i] >= 0 enteros
+    - cotas n[i] <= N[i], o n[i] <= N[i] * y[i] con y binaria (y[i] = 1 si
+      se coge el objeto i)
+y guarda la solución en n y en y. Con cualquier otra restricción, o si la
+tabla de la programación dinámica es demasiado grande, se resuelve el MILP
+con el solver indicado.
+
+Uso:
+    from mochila_dp import resolver_mochila
+    results = resolver_mochila(m)          # o motor = 'milp'
+    results.write()
+'''
+
+# > Tamaño máximo de la tabla de la programación dinámica (celdas)
+MAX_CELDAS = 5 * 10**7
+
+
+def cota_lp(p, w, W, N):
+    # Menor de las relajaciones lineales de cada capacidad por separado
+    cota = float(np.dot(p, N))
+    for wk, Wk in zip(w, W):
+        gratis = wk == 0
+        valor = float(np.dot(p[gratis], N[gratis]))
+        libre = float(Wk)
+        orden = np.argsort(-(p / np.where(gratis, 1, wk)), kind = 'stable')
+        for i in orden[~gratis[orden]]:
+            cabe = min(N[i], libre / wk[i])
+            valor += p[i] * cabe
+            libre -= wk[i] * cabe
+            if libre <= 0:
+                break
+        cota = min(cota, valor)
+    return cota
+
+
+def voraz(p, w, W, N):
+    # Objetos por orden de precio frente a la fracción de capacidad que usan
+    uso = (w / np.maximum(W, 1)[:, None]).sum(axis = 0)
+    orden = np.argsort(-(p / np.maximum(uso, 1e-12)), kind = 'stable')
+    libre = np.array(W, dtype = float)
+    n = np.zeros(len(p), dtype = int)
+    for i in orden:
+        caben = [libre[k] // w[k, i] for k in range(len(W)) if w[k, i] > 0]
+        n[i] = min([N[i]] + caben)
+        libre -= w[:, i] * n[i]
+    return n
+
+
+def mochila_dp(p, w, W, N):
+    '''
+    p: precios (objetos). w: pesos (capacidades x objetos), enteros.
+    W: capacidades. N: unidades disponibles de cada objeto.
+    Devuelve el número de unidades de cada objeto en la solución óptima.
+    '''
+    p = np.asarray(p, dtype = float)
+    w = np.asarray(w, dtype = np.int64).reshape(-1, len(p))
+    W = np.asarray(W, dtype = np.int64)
+    N = np.minimum(np.asarray(N, dtype = np.int64), _unidades_maximas(w, W))
+
+    # > Si la solución voraz alcanza la cota LP es óptima
+    n_voraz = voraz(p, w, W, N)
+    valor = np.dot(p, n_voraz)
+    if valor >= cota_lp(p, w, W, N) - 1e-9:
+        return n_voraz
+
+    # > Poda: si con una unidad del objeto i la cota LP no supera la solución
+    #   voraz, el objeto i no se coge en la programación dinámica
+    N = N.copy()
+    for i in np.flatnonzero(N > 0):
+        resto = N.copy()
+        resto[i] -= 1
+        if p[i] + cota_lp(p, w, W - w[:, i], resto) <= valor + 1e-9:
+            N[i] = 0
+
+    # > Las capacidades se reducen con el máximo común divisor de sus pesos
+    g = np.array([_mcd(wk) for wk in w])
+    w = w // g[:, None]
+    W = W // g
+
+    # > Objetos divididos en paquetes de 1, 2, 4, ... unidades
+    paquetes = []
+    for i in np.flatnonzero((N > 0) & (p > 0)):
+        unidades, k = int(N[i]), 1
+        while unidades > 0:
+            paquete = min(k, unidades)
+            paquetes.append((i, paquete))
+            unidades -= paquete
+            k *= 2
+
+    forma = tuple(int(Wk) + 1 for Wk in W)
+    f = np.zeros(forma)
+    elegido = np.zeros((len(paquetes),) + forma, dtype = bool)
+    for k, (i, paquete) in enumerate(paquetes):
+        wk = [int(w[d, i]) * paquete for d in range(len(W))]
+        if any(wk[d] >= forma[d] for d in range(len(W))):
+            continue
+        destino = tuple(slice(wk[d], None) for d in range(len(W)))
+        origen = tuple(slice(0, forma[d] - wk[d]) for d in range(len(W)))
+        candidato = f[origen] + p[i] * paquete
+        mejora = candidato > f[destino]
+        elegido[k][destino] = mejora
+        f[destino] = np.where(mejora, candidato, f[destino])
+
+    # > Reconstrucción de la solución desde la capacidad total
+    n = np.zeros(len(p), dtype = int)
+    celda = list(W)
+    for k in range(len(paquetes) - 1, -1, -1):
+        if elegido[k][tuple(celda)]:
+            i, paquete = paquetes[k]
+            n[i] += paquete
+            celda = [celda[d] - int(w[d, i]) * paquete for d in range(len(W))]
+    return n if np.dot(p, n) > valor else n_voraz
+
+
+def _mcd(wk):
+    # Máximo común divisor de los pesos no nulos de una capacidad
+    return int(np.gcd.reduce(wk[wk > 0])) if (wk > 0).any() else 1
+
+
+def _unidades_maximas(w, W):
+    # Unidades de cada objeto que caben solas en todas las capacidades
+    with np.errstate(divide = 'ignore'):
+        limite = np.where(w > 0, W[:, None] // np.maximum(w, 1), np.iinfo(np.int64).max)
+    return limite.min(axis = 0)
+
+
+def _estructura(m):
+    # Devuelve los datos de la mochila o None si el modelo no es una mochila
+    objetivos = list(m.component_data_objects(Objective, active = True))
+    if len(objetivos) != 1 or objetivos[0].sense != maximize:
+        return None
+    repn = generate_standard_repn(objetivos[0].expr, quadratic = False)
+    if not repn.is_linear() or any(coef < 0 for coef in repn.linear_coefs):
+        return None
+
+    # > Objetos: variables enteras no negativas del objetivo o de las capacidades
+    objetos, posicion = [], {}
+
+    def objeto(var):
+        if id(var) not in posicion:
+            if not var.is_integer() or var.lb != 0 or var.fixed:
+                return None
+            posicion[id(var)] = len(objetos)
+            objetos.append(var)
+        return posicion[id(var)]
+
+    precios = {}
+    for coef, var in zip(repn.linear_coefs, repn.linear_vars):
+        k = objeto(var)
+        if k is None:
+            return None
+        precios[k] = coef
+
+    cotas, enlaces, filas, W = {}, {}, [], []
+    for r in m.component_data_objects(Constraint, active = True):
+        if r.has_lb() or not r.has_ub():
+            return None
+        repn_r = generate_standard_repn(r.body, quadratic = False)
+        if not repn_r.is_linear():
+            return None
+        limite = value(r.upper) - repn_r.constant
+        pares = list(zip(repn_r.linear_coefs, repn_r.linear_vars))
+        negativos = [(coef, var) for coef, var in pares if coef < 0]
+
+        if len(pares) == 2 and len(negativos) == 1 and limite == 0:
+            # Enlace: a * n[i] - U * y[i] <= 0, con y binaria
+            (coef_n, var_n), = [(coef, var) for coef, var in pares if coef > 0]
+            (coef_y, var_y), = negativos
+            k = objeto(var_n)
+            if k is None or not var_y.is_binary() or var_y.fixed or id(var_y) in posicion:
+                return None
+            cotas[k] = min(cotas.get(k, np.inf), math.floor(-coef_y / coef_n + 1e-9))
+            enlaces[k] = var_y
+        elif negativos or any(coef != int(coef) for coef, var in pares):
+            return None
+        elif len(pares) == 1:
+            # Cota: a * n[i] <= N
+            coef, var = pares[0]
+            k = objeto(var)
+            if k is None:
+                return None
+            cotas[k] = min(cotas.get(k, np.inf), math.floor(limite / coef + 1e-9))
+        else:
+            # Capacidad: sum(w[i] * n[i]) <= W
+            fila = {}
+            for coef, var in pares:
+                k = objeto(var)
+                if k is None:
+                    return None
+                fila[k] = fila.get(k, 0) + coef
+            filas.append(fila)
+            W.append(math.floor(limite + 1e-9))
+
+    if not filas or min(W) < 0 or any(id(var) in posicion for var in enlaces.values()):
+        return None
+    p = np.array([precios.get(k, 0) for k in range(len(objetos))], dtype = float)
+    w = np.zeros((len(filas), len(objetos)), dtype = np.int64)
+    for d, fila in enumerate(filas):
+        for k, coef in fila.items():
+            w[d, k] = coef
+    W = np.array(W, dtype = np.int64)
+    N = np.array([min(cotas.get(k, np.inf), var.ub if var.ub is not None else np.inf)
+                  for k, var in enumerate(objetos)])
+    N = np.minimum(N, _unidades_maximas(w, W))
+    if not np.isfinite(N).all():
+        return None
+    return repn, objetos, enlaces, p, w, W, N.astype(np.int64)
+
+
+def resolver_mochila(m, motor = 'dp', solver = 'glpk'):
+    estructura = _estructura(m) if motor == 'dp' else None
+    if estructura is not None:
+        repn, objetos, enlaces, p, w, W, N = estructura
+        celdas = np.prod([float(Wk // _mcd(wk) + 1) for wk, Wk in zip(w, W)])
+        if celdas * (1 + np.log2(N + 1).sum()) <= MAX_CELDAS:
+            n = mochila_dp(p, w, W, N)
+
+            # > La solución se guarda en n y en las binarias enlazadas
+            for var, unidades in zip(objetos, n.tolist()):
+                var.set_value(unidades)
+            for k, var_y in enlaces.items():
+                var_y.set_value(1 if n[k] > 0 else 0)
+
+            valor = float(np.dot(p, n) + repn.constant)
+            results = SolverResults()
+            results.problem.name = m.name
+            results.problem.sense = maximize
+            results.problem.lower_bound = valor
+            results.problem.upper_bound = valor
+            results.problem.number_of_variables = len(objetos) + len(enlaces)
+            results.problem.number_of_constraints = len(W)
+            results.problem.number_of_objectives = 1
+            results.solver.name = 'mochila (voraz, cota LP y programación dinámica)'
+            results.solver.status = SolverStatus.ok
+            results.solver.termination_condition = TerminationCondition.optimal
+            return results
+
+    # > Modelo general: se resuelve el MILP
+    opt = SolverFactory(solver)
+    return opt.solve(m)
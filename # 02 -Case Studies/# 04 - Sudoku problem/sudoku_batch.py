@@ -0,0 +1,170 @@
+"""
+*-------------------------------------------------------------------------------------
+*                           #### SUDOKU GAME - BATCH SOLVER ####
+*-------------------------------------------------------------------------------------
+
+  Solves every puzzle workbook found in a folder (sudoku_data_1.xlsx,
+  sudoku_data_2.xlsx, ...) with the model of sudoku_problem.py.
+
+  The 729-binary model structure is built only once in every worker process.
+  For each puzzle only the variables fixed by the presolve of the givens
+  (sudoku_presolve.py) are unfixed and fixed again before re-solving, and
+  puzzles solved by the presolve alone skip the solver. Puzzles are spread
+  across a process pool and the solution of every puzzle is written to
+  <puzzle>_sol.xlsx
+
+  Usage:
+      python sudoku_batch.py [input_folder] [output_folder]
+
+"""
+
+
+import glob
+import os
+import sys
+from multiprocessing import Pool
+
+from  pyomo.environ import *
+import pandas as pd
+
+from sudoku_presolve import propagate, fix_candidates
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from solver_memoria import crear_solver_en_memoria
+
+
+# 01 # Model structure (same equations as sudoku_problem.py)
+def build_model(row, column):
+
+	model = ConcreteModel (name = "SUDOKU PROBLEM ")
+
+	r = model.r = Set(initialize = row, ordered = True)
+	c = model.c = Set(initialize = column, ordered = True)
+	k = model.k = Set(initialize = [str(kk) for kk in range(1, len(row) + 1)], ordered = True)
+
+	y = model.y = Var(r, c, k, domain = Binary)
+
+	model.dummy_obj = Objective(expr = 1)
+
+	# > Only one value in each Row
+	def constraint_row_rule (model, rr, kk):
+		return sum(y[rr,cc,kk] for cc in c ) == 1
+	model.constraint_row = Constraint(r, k, rule = constraint_row_rule)
+
+	# > Only one value in each Column
+	def constraint_column_rule (model, cc, kk):
+		return sum(y[rr,cc,kk] for rr in r ) == 1
+	model.constraint_column = Constraint(c, k, rule = constraint_column_rule)
+
+	# > Every cell in the SUDOKU must be filled with a number
+	def constraint_cells_rule(model, rr, cc):
+		return sum ( y[rr, cc, kk] for kk in k) == 1
+	model.constraing_cells = Constraint(r, c, rule = constraint_cells_rule)
+
+	# > Only one value in each nxn Grid
+	n = int(round(len(row) ** 0.5))
+	block = model.block = Set(initialize = ['b' + str(bb + 1) for bb in range(n * n)], ordered = True)
+
+	block_cells = {}
+	for bb, b_name in enumerate(block):
+		row_0 = n * (bb // n)
+		col_0 = n * (bb % n)
+		block_cells[b_name] = [(row[row_0 + dr], column[col_0 + dc]) for dr in range(n) for dc in range(n)]
+
+	def constraint_grid_rule (model, bb, kk):
+		return sum( y[rr,cc,kk] for (rr, cc) in block_cells[bb] ) == 1
+	model.constraint_grid = Constraint(block, k, rule = constraint_grid_rule)
+
+	return model
+
+
+# 02 # Worker state. Every process keeps its models (one per grid size),
+#      the solver and the variables fixed by the last puzzle
+_models = {}
+_fixed  = {}
+_opt    = None
+
+
+def get_model(row, column):
+	key = (tuple(row), tuple(column))
+	if key not in _models:
+		_models[key] = build_model(row, column)
+		_fixed[key]  = []
+	return _models[key], _fixed[key]
+
+
+def fix_givens(model, fixed, data_df):
+	# > Release the variables fixed for the previous puzzle
+	for var in fixed:
+		var.unfix()
+	del fixed[:]
+
+	# > Presolve the new givens and fix every variable it determines
+	givens = data_df.stack().to_dict()
+	candidates = propagate(data_df.index.tolist(), data_df.columns.tolist(), givens)
+	presolve_fixed, solved = fix_candidates(model.y, model.k, candidates)
+	fixed.extend(presolve_fixed)
+
+	return solved
+
+
+# 03 # Solve a single puzzle workbook
+def solve_puzzle(args):
+	filename, output_folder = args
+	name = os.path.splitext(os.path.basename(filename))[0]
+
+	global _opt
+	if _opt is None:
+		_opt = crear_solver_en_memoria(alternativa = 'glpk')
+
+	data_df = pd.read_excel(filename,   index_col = 0)
+
+	row    = data_df.index.tolist()
+	column = data_df.columns.tolist()
+
+	n = int(round(len(row) ** 0.5))
+	if len(row) != len(column) or n * n != len(row):
+		return name, 'skipped: grid of {0}x{1} is not n^2 x n^2'.format(len(row), len(column))
+
+	model, fixed = get_model(row, column)
+	try:
+		solved = fix_givens(model, fixed, data_df)
+	except ValueError as e:
+		return name, 'infeasible: {0}'.format(e)
+
+	# > Puzzles solved by the presolve do not reach the solver
+	if solved:
+		status = 'presolve'
+	else:
+		results = _opt.solve(model)
+		if results.solver.termination_condition != TerminationCondition.optimal:
+			return name, str(results.solver.termination_condition)
+		status = 'optimal'
+
+	sudoku_sol = data_df.astype(object)
+	for i in model.y:
+		if model.y[i].value > 0.5:
+			sudoku_sol.at[i[0], i[1]] = int(i[2])
+
+	sudoku_sol.to_excel(os.path.join(output_folder, name + '_sol.xlsx'))
+
+	return name, status
+
+
+# ======================================================================================
+#---------------------------------- BATCH ----------------------------------------------
+# ======================================================================================
+
+if __name__ == '__main__':
+
+	input_folder  = sys.argv[1] if len(sys.argv) > 1 else '.'
+	output_folder = sys.argv[2] if len(sys.argv) > 2 else input_folder
+
+	puzzles = sorted(f for f in glob.glob(os.path.join(input_folder, '*.xlsx'))
+	                 if not f.endswith('_sol.xlsx'))
+
+	pool = Pool()
+	for name, status in pool.imap_unordered(solve_puzzle, [(f, output_folder) for f in puzzles]):
+		print('{0:30s} {1}'.format(name, status))
+	pool.close()
+	pool.join()
@@ -0,0 +1,110 @@
+"""
+*-------------------------------------------------------------------------------------
+*                           #### SUDOKU GAME - PRESOLVE ####
+*-------------------------------------------------------------------------------------
+
+  Constraint propagation run on the givens before the MILP.
+
+  Every cell keeps the set of digits that are still possible. Two rules are
+  applied until nothing changes:
+    - Naked single:  a cell with only one candidate takes that digit and it
+                     is removed from every other cell of its row, column and block.
+    - Hidden single: a digit that fits in only one cell of a row, column or
+                     block is placed in that cell.
+
+  Every y[r,c,k] whose digit is no longer a candidate can be fixed to 0 and
+  every cell with a single candidate to 1. When all the cells are determined
+  the puzzle is solved and the solver does not need to be called.
+
+"""
+
+
+def sudoku_units(row, column):
+	# > Rows, columns and nxn blocks of a n^2 x n^2 grid as lists of cells
+	n = int(round(len(row) ** 0.5))
+
+	units  = [[(rr, cc) for cc in column] for rr in row]
+	units += [[(rr, cc) for rr in row] for cc in column]
+	for bb in range(n * n):
+		row_0 = n * (bb // n)
+		col_0 = n * (bb % n)
+		units.append([(row[row_0 + dr], column[col_0 + dc]) for dr in range(n) for dc in range(n)])
+
+	return units
+
+
+def propagate(row, column, givens):
+	"""
+	givens: {(r, c): digit} with NaN (or None) for the empty cells.
+	Returns {(r, c): set of candidate digits}. Raises ValueError when the
+	givens are contradictory.
+	"""
+	digits = set(range(1, len(row) + 1))
+	units  = sudoku_units(row, column)
+
+	# > Peers of every cell: cells sharing a row, a column or a block
+	peers = {(rr, cc): set() for rr in row for cc in column}
+	for unit in units:
+		for cell in unit:
+			peers[cell].update(unit)
+	for cell in peers:
+		peers[cell].discard(cell)
+
+	candidates = {cell: set(digits) for cell in peers}
+
+	def assign(cell, digit):
+		# Place digit in cell and remove it from the peers (naked singles chain)
+		pending = [(cell, digit)]
+		while pending:
+			cell, digit = pending.pop()
+			if digit not in candidates[cell]:
+				raise ValueError('digit {0} is not possible in cell {1}'.format(digit, cell))
+			candidates[cell] = {digit}
+			for peer in peers[cell]:
+				if digit in candidates[peer]:
+					candidates[peer].discard(digit)
+					if not candidates[peer]:
+						raise ValueError('cell {0} has no candidates left'.format(peer))
+					if len(candidates[peer]) == 1:
+						pending.append((peer, next(iter(candidates[peer]))))
+
+	for cell, value in givens.items():
+		if value is None or value != value:      # empty cell (NaN)
+			continue
+		if len(candidates[cell]) > 1 or int(value) not in candidates[cell]:
+			assign(cell, int(value))
+
+	# > Hidden singles, repeated until no new digit is placed
+	changed = True
+	while changed:
+		changed = False
+		for unit in units:
+			for digit in digits:
+				places = [cell for cell in unit if digit in candidates[cell]]
+				if not places:
+					raise ValueError('digit {0} does not fit in unit {1}'.format(digit, unit))
+				if len(places) == 1 and len(candidates[places[0]]) > 1:
+					assign(places[0], digit)
+					changed = True
+
+	return candidates
+
+
+def fix_candidates(y, k, candidates):
+	"""
+	Fixes y[r,c,k] to 0 for the discarded digits and to 1 for the determined
+	cells. Returns the list of fixed variables and whether the puzzle is solved.
+	"""
+	fixed = []
+	for (rr, cc), digits in candidates.items():
+		for kk in k:
+			if int(kk) not in digits:
+				y[rr, cc, kk].fix( 0 )
+				fixed.append(y[rr, cc, kk])
+			elif len(digits) == 1:
+				y[rr, cc, kk].fix( 1 )
+				fixed.append(y[rr, cc, kk])
+
+	solved = all(len(digits) == 1 for digits in candidates.values())
+
+	return fixed, solved
@@ -14,12 +14,26 @@
 """
 
 
+import os
+import sys
+
 from  pyomo.environ import *
 import pandas as pd
 
+from sudoku_presolve import propagate, fix_candidates
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from model_profiler import ModelProfiler
+from solver_memoria import crear_solver_en_memoria
+
 
 model = ConcreteModel (name = "SUDOKU PROBLEM ")
 
+# > Build profiling. When switched on, the time, expression nodes and memory of
+#   every component, the presolve and the solver call are reported
+profile = False
+profiler = ModelProfiler(model, enabled = profile)
+
 # 01 # Read data form excel file using pandas
 sudoku_data = 'sudoku_data_2'
 
@@ -31,7 +45,7 @@ column = data_df.columns.tolist()
 
 r = model.r = Set(initialize = row, ordered = True)
 c = model.c = Set(initialize = column, ordered = True)
-k = model.k = Set(initialize = ['1', '2', '3', '4', '5', '6', '7', '8', '9'], ordered = True)
+k = model.k = Set(initialize = [str(kk) for kk in range(1, len(row) + 1)], ordered = True)
 
 # 03 # Sudoku givens
 givens = {(i,j): data_df.at[i,j] for i in r for j in c}
@@ -55,6 +69,14 @@ for i in r:
 			if value == 1:
 				y[i,j,kk].fix( 1 )
 
+# > Presolve. Naked / hidden singles propagation on the givens fixes every
+#   y[r,c,k] it can to 0 or 1. If every cell is determined the MILP is skipped
+with profiler.section('presolve'):
+	candidates = propagate(row, column, givens)
+	presolve_fixed, solved = fix_candidates(y, k, candidates)
+
+print('Presolve: {0} of {1} binaries fixed'.format(len(presolve_fixed), len(y)))
+
 
 			
 # Model Constraints
@@ -88,64 +110,23 @@ def constraint_cells_rule(model, rr, cc):
 model.constraing_cells = Constraint(r, c, rule = constraint_cells_rule)
 
 
-# 10 # Only one value in each 3x3 Grid
-block = model.block = Set(initialize = ['b1', 'b2', 'b3', 'b4', 'b5', 'b6', 'b7', 'b8', 'b9'], ordered = True)
-
-
-# > Aux Set. Relationship blocks with rows
-br = model.br = Set(within = block * r, ordered = True )
-
-br_mapping = {
-              'b1': ('r1', 'r2', 'r3'), 
-              'b2': ('r1', 'r2', 'r3'),
-			  'b3': ('r1', 'r2', 'r3'),
-			  
-			  'b4': ('r4', 'r5', 'r6'),
-			  'b5': ('r4', 'r5', 'r6'),
-			  'b6': ('r4', 'r5', 'r6'),
-			  
-			  'b7': ('r7', 'r8', 'r9'),
-			  'b8': ('r7', 'r8', 'r9'),
-			  'b9': ('r7', 'r8', 'r9')
-}
-
-for s in br_mapping:
-    for ss in br_mapping[s]:
-        br.add((s, ss))
-		
-		
-# > Aux Set. Relationship blocks with columns
-bc = model.bc = Set(within = block * c, ordered = True )
-
-bc_mapping = {
-              'b1': ('c1', 'c2', 'c3'), 
-              'b2': ('c4', 'c5', 'c6'),
-			  'b3': ('c7', 'c8', 'c9'),
-			  
-              'b4': ('c1', 'c2', 'c3'), 
-              'b5': ('c4', 'c5', 'c6'),
-			  'b6': ('c7', 'c8', 'c9'),
-			  
-              'b7': ('c1', 'c2', 'c3'), 
-              'b8': ('c4', 'c5', 'c6'),
-			  'b9': ('c7', 'c8', 'c9'),
-}
-
-for s in bc_mapping:
-    for ss in bc_mapping[s]:
-        bc.add((s, ss))
-
-# > Block definition
-brc = model.brc = Set(within = block * r * c, ordered = True)
-
-for s in br:
-	for ss in bc:
-		if s[0] == ss[0]:
-			brc.add((s[0], s[1], ss[1]))
-
-# > Only one value in each 3x3 Grid
+# 10 # Only one value in each nxn Grid
+# A n^2 x n^2 SUDOKU (9x9, 16x16, 25x25, ...) is divided in n^2 blocks of nxn cells
+n = int(round(len(row) ** 0.5))
+
+block = model.block = Set(initialize = ['b' + str(bb + 1) for bb in range(n * n)], ordered = True)
+
+# > Block definition. Block -> cells index computed arithmetically once:
+#   block number bb starts at row n*(bb // n) and at column n*(bb % n)
+block_cells = {}
+for bb, b_name in enumerate(block):
+	row_0 = n * (bb // n)
+	col_0 = n * (bb % n)
+	block_cells[b_name] = [(row[row_0 + dr], column[col_0 + dc]) for dr in range(n) for dc in range(n)]
+
+# > Only one value in each nxn Grid. Every constraint touches only its n^2 cells
 def constraint_grid_rule (model, bb, kk):
-	return sum( y[rr,cc,kk] for rr in r for cc in c if(bb, rr, cc) in brc ) == 1
+	return sum( y[rr,cc,kk] for (rr, cc) in block_cells[bb] ) == 1
 
 model.constraint_grid = Constraint(block, k, rule = constraint_grid_rule)
 
@@ -157,8 +138,13 @@ model.constraint_grid = Constraint(block, k, rule = constraint_grid_rule)
 # eq_04_grid(b9,9)..  y(r7,c7,9) + y(r7,c8,9) + y(r7,c9,9) + y(r8,c7,9) + y(r8,c8,9) + y(r8,c9,9) + y(r9,c7,9) + y(r9,c8,9) + y(r9,c9,9) =E= 1	  
 
 
-# 11 # Call MILP Solver
-SolverFactory('glpk').solve(model, tee = True)
+# 11 # Call MILP Solver (only when the presolve did not solve the puzzle)
+if not solved:
+	profiler.solve(crear_solver_en_memoria(alternativa = 'glpk'), model, tee = True)
+
+if profile:
+	profiler.report()
+	profiler.export_trace(sudoku_data + '_profile.json')
 
 
 
@@ -168,10 +154,12 @@ SolverFactory('glpk').solve(model, tee = True)
 
 SUDOKU = {(i,j): kk for i in r for j in c for kk in k if y[i,j,kk].value == 1 }
 
-sudoku_sol = data_df
+# > The given cells are read as floats (empty cells are NaN), so the solution is
+#   written on an object copy of the table
+sudoku_sol = data_df.astype(object)
 for i in y:
-	if y[i].value == 1:
-		sudoku_sol.at[i[0], i[1]] = i[2]
+	if y[i].value is not None and y[i].value > 0.5:
+		sudoku_sol.at[i[0], i[1]] = int(i[2])
 	
 
 print(sudoku_sol)
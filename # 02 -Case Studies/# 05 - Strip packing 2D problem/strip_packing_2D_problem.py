@@ -23,17 +23,31 @@
 """
 
 
+import os
+import sys
+
 from  pyomo.environ import *
 import pandas as pd
 import numpy as np
 
+from strip_packing_heuristic import shelf_packing
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from model_profiler import ModelProfiler
+from solver_memoria import crear_solver_en_memoria
+
 
 model = ConcreteModel (name = "STRIP-PACKING 2D PROBLEM ")
 
+# > Build profiling. When switched on, the time, expression nodes and memory of
+#   every component and of the solver call are reported
+profile = False
+profiler = ModelProfiler(model, enabled = profile)
+
 # 01 # Read data form excel file using pandas
 excel_filename = 'strip_packing_2D_data.xlsx';
 
-sp2d_df = pd.read_excel(excel_filename,   skiprows = 3, parse_cols = 'B:D', skip_footer = 0, index_col = 0, header = 0)
+sp2d_df = pd.read_excel(excel_filename,   skiprows = 3, usecols = 'B:D', skipfooter = 0, index_col = 0, header = 0)
 
 
 # 02 # Set declarations
@@ -54,11 +68,30 @@ L_up = sp2d_df['L'].sum() # Total Length if all the rectangles are stacked toget
 width_strip = sp2d_df['H'].max()
 W = width_strip
 
-# Big-M parameter
-M1 = 70 
-M2 = 70 
-M3 = 60 
-M4 = 60 
+# > Reformulation of the disjunctions: 'bigm' or 'hull'
+reformulation = 'bigm'
+
+# > Time limit of the solve in seconds (None: until optimality is proven). The
+#   best layout found so far is kept when the limit is reached
+time_limit = 60
+
+
+# > Pairs of rectangles. Only pairs with i before j need a disjunction
+pairs = [(i, j) for i in I for j in I if I.ord(i) < I.ord(j)]
+P = model.P = Set(initialize = pairs, dimen = 2, ordered = True, doc = 'Unordered pairs of rectangles')
+
+# > Pairs that fit one above the other. If H[i] + H[j] > W the rectangles can
+#   never be stacked vertically and only the horizontal disjuncts are kept
+PV = model.PV = Set(initialize = [(i, j) for (i, j) in pairs if H[i] + H[j] <= W],
+                    dimen = 2, ordered = True, doc = 'Pairs that can be stacked vertically')
+
+# > Symmetry breaking. Identical rectangles are interchangeable, so the one
+#   that comes first is never placed to the right of the other: x[i] <= x[j]
+#   and the disjunct "j to the left of i" is not needed
+PS = model.PS = Set(initialize = [(i, j) for (i, j) in pairs if L[i] == L[j] and H[i] == H[j]],
+                    dimen = 2, ordered = True, doc = 'Pairs of identical rectangles')
+PH = model.PH = Set(initialize = [(i, j) for (i, j) in pairs if not (L[i] == L[j] and H[i] == H[j])],
+                    dimen = 2, ordered = True, doc = 'Pairs where j can be placed to the left of i')
 
 
 # 05 # Decision Variables or Independent Variables Declaration
@@ -68,11 +101,26 @@ x  = model.x  = Var(I, domain = NonNegativeReals, doc = 'x axis position' )
 y  = model.y  = Var(I, domain = NonNegativeReals, doc = 'y axis position')
  
 	
-# Binary Variables
-w1 = model.w1 = Var(I,J, domain = Binary)
-w2 = model.w2 = Var(I,J, domain = Binary)
-w3 = model.w3 = Var(I,J, domain = Binary)
-w4 = model.w4 = Var(I,J, domain = Binary)
+# > Heuristic incumbent (shelf packing). The length of its layout is an upper
+#   bound for the length of the strip, tighter than L_up
+with profiler.section('shelf_packing'):
+	x_heur, y_heur, L_heur = shelf_packing(rectangle_i, L, H, W)
+print('Shelf heuristic. Length of the strip: ', L_heur)
+
+lt.setub(L_heur)
+
+# > x-coordinate upper bound for every rectangle
+x_UP =  min(L_up, L_heur)
+
+for i in I:
+	x[i].setub(x_UP - L[i])
+
+
+# > y-coordinate upper and lower bounds
+for i in I:
+	y[i].setub(W)
+	y[i].setlb(H[i])
+
 
 #----------------------------------------------------------
 # ### MODEL EQUATIONS ###
@@ -87,106 +135,159 @@ def global_constraint_rule (model, i):
 	return lt >= x[i] + L[i]
 model.global_constraint = Constraint(I, rule = global_constraint_rule)
 
-# 08 # Disjunctions. Big-M Reformulation 
+# 08 # Disjunctions
 # Each disjunct represents the position of rectangle i in relation to rectangle j
 # The point of  reference (xi, yi)  corresponds  to  the  upper  left  corner  of  every rectangle
-
-# > Disjunction <1>
-def disjunction_1_rule (model, i, j):
-	if i < j:
-		return x[i] + L[i] <= x[j] + M1 * (1 - w1[i,j])
-	else:
-		return Constraint.Skip
-model.disjunction_1 = Constraint(I, J, rule = disjunction_1_rule)
-
-
-# > Disjunction <2>
-def disjunction_2_rule (model, i, j):
-	if i < j:
-		return x[j] + L[j] <= x[i] + M2 * (1 - w2[i,j])
-	else:
-		return Constraint.Skip
-model.disjunction_2 = Constraint(I, J, rule = disjunction_2_rule)
-
-
-# > Disjunction <3>
-def disjunction_3_rule (model, i, j):
-	if i < j:
-		return y[i] - H[i] >= y[j] - M3 * (1 - w3[i,j])
-	else:
-		return Constraint.Skip
-model.disjunction_3 = Constraint(I, J, rule = disjunction_3_rule)
-
-# > Disjunction <4>
-def disjunction_4_rule (model, i, j):
-	if i < j:
-		return y[j] - H[j] >= y[i] - M4 * (1 - w4[i,j])
-	else:
-		return Constraint.Skip
-model.disjunction_4 = Constraint(I, J, rule = disjunction_4_rule)
-
-# 09 # 
-def logic_proposition_rule (model, i, j):
-	if i < j:
-		return w1[i,j] + w2[i,j] + w3[i,j] + w4[i,j] == 1
-	else:
-		return Constraint.Skip
-model.logic_proposition = Constraint(I, J, rule = logic_proposition_rule)
-
-
-# 10 # x-coordinate upper bound for every rectangle
-x_UP =  L_up
-
-for i in I:
-    x[i].setub(x_UP - L[i])
-	 
-
-# 10 # y-coordinate upper and lower bounds
+#   <1> i to the left of j      <2> j to the left of i
+#   <3> i above j               <4> j above i
+disjunct_pairs = {1: P, 2: PH, 3: PV, 4: PV}
+
+if reformulation == 'bigm':
+
+	# Binary Variables (one per pair and feasible disjunct)
+	w1 = model.w1 = Var(P,  domain = Binary)
+	w2 = model.w2 = Var(PH, domain = Binary)
+	w3 = model.w3 = Var(PV, domain = Binary)
+	w4 = model.w4 = Var(PV, domain = Binary)
+
+	# > Big-M parameters. The tightest valid value for every pair is the largest
+	#   violation of its disjunct allowed by the variable bounds
+	M1 = {(i, j): x[i].ub + L[i] - x[j].lb for (i, j) in P}
+	M2 = {(i, j): x[j].ub + L[j] - x[i].lb for (i, j) in PH}
+	M3 = {(i, j): y[j].ub - y[i].lb + H[i] for (i, j) in PV}
+	M4 = {(i, j): y[i].ub - y[j].lb + H[j] for (i, j) in PV}
+
+	# > Disjunction <1>
+	def disjunction_1_rule (model, i, j):
+		return x[i] + L[i] <= x[j] + M1[i,j] * (1 - w1[i,j])
+	model.disjunction_1 = Constraint(P, rule = disjunction_1_rule)
+
+	# > Disjunction <2>
+	def disjunction_2_rule (model, i, j):
+		return x[j] + L[j] <= x[i] + M2[i,j] * (1 - w2[i,j])
+	model.disjunction_2 = Constraint(PH, rule = disjunction_2_rule)
+
+	# > Disjunction <3>
+	def disjunction_3_rule (model, i, j):
+		return y[i] - H[i] >= y[j] - M3[i,j] * (1 - w3[i,j])
+	model.disjunction_3 = Constraint(PV, rule = disjunction_3_rule)
+
+	# > Disjunction <4>
+	def disjunction_4_rule (model, i, j):
+		return y[j] - H[j] >= y[i] - M4[i,j] * (1 - w4[i,j])
+	model.disjunction_4 = Constraint(PV, rule = disjunction_4_rule)
+
+	# 09 # One of the (remaining) disjuncts must hold for every pair
+	def logic_proposition_rule (model, i, j):
+		w_ij = [w1[i,j]]
+		if (i, j) in PH:
+			w_ij.append(w2[i,j])
+		if (i, j) in PV:
+			w_ij += [w3[i,j], w4[i,j]]
+		return sum(w_ij) == 1
+	model.logic_proposition = Constraint(P, rule = logic_proposition_rule)
+
+else:
+
+	# > Generalized disjunctive programming model, reformulated with the hull
+	#   (convex hull) transformation. It needs no big-M values and gives a
+	#   tighter relaxation at the cost of more variables and constraints
+	from pyomo.gdp import Disjunct, Disjunction
+
+	D = model.D = Set(initialize = [(i, j, d) for d in disjunct_pairs for (i, j) in disjunct_pairs[d]],
+	                  dimen = 3, ordered = True, doc = 'Feasible disjuncts of every pair')
+
+	def position_rule (disjunct, i, j, d):
+		if d == 1:
+			disjunct.c = Constraint(expr = x[i] + L[i] <= x[j])
+		elif d == 2:
+			disjunct.c = Constraint(expr = x[j] + L[j] <= x[i])
+		elif d == 3:
+			disjunct.c = Constraint(expr = y[i] - H[i] >= y[j])
+		else:
+			disjunct.c = Constraint(expr = y[j] - H[j] >= y[i])
+	model.position = Disjunct(D, rule = position_rule)
+
+	# 09 # One of the (remaining) disjuncts must hold for every pair
+	def no_overlap_rule (model, i, j):
+		return [model.position[i, j, d] for d in disjunct_pairs if (i, j) in disjunct_pairs[d]]
+	model.no_overlap = Disjunction(P, rule = no_overlap_rule)
+
+	with profiler.section('gdp.hull'):
+		TransformationFactory('gdp.hull').apply_to(model)
+
+# > Symmetry breaking for identical rectangles
+def symmetry_breaking_rule (model, i, j):
+	return x[i] <= x[j]
+model.symmetry_breaking = Constraint(PS, rule = symmetry_breaking_rule)
+
+
+# 11 # MIP start. The heuristic layout is loaded as the initial solution
+lt.value = L_heur
 for i in I:
-	y[i].setub(W)
-	y[i].setlb(H[i])
-	
-	
-# 12 # Call MILP Solver
-SolverFactory("glpk").solve(model, tee = True)
+	x[i].value = x_heur[i]
+	y[i].value = y_heur[i]
+
+if reformulation == 'bigm':
+	for (i, j) in P:
+		# First disjunct satisfied by the pair in the heuristic layout
+		if x_heur[i] + L[i] <= x_heur[j]:
+			w_start = 1
+		elif (i, j) in PH and x_heur[j] + L[j] <= x_heur[i]:
+			w_start = 2
+		elif (i, j) in PV and y_heur[i] - H[i] >= y_heur[j]:
+			w_start = 3
+		else:
+			w_start = 4
+		for d, w in ((1, w1), (2, w2), (3, w3), (4, w4)):
+			if (i, j) in disjunct_pairs[d]:
+				w[i,j].value = int(d == w_start)
+
+
+# 12 # Call MILP Solver (warm started when the solver supports it)
+opt = crear_solver_en_memoria(alternativa = 'glpk')      # HiGHS in memory, or glpk
+solve_options = {'tee': True}
+if opt.warm_start_capable():
+	solve_options['warmstart'] = True
+if time_limit is not None:
+	if hasattr(opt, 'config'):      # in-memory solvers
+		solve_options['timelimit'] = time_limit
+	else:                           # glpk
+		opt.options['tmlim'] = time_limit
+results = profiler.solve(opt, model, **solve_options)
+print('Termination condition: ', results.solver.termination_condition)
+
+if profile:
+	profiler.report()
+	profiler.export_trace('strip_packing_2D_profile.json')
 
 
 # 13 # Plot Results ===========================================================
 
-xi_array = np.array([])
-yi_array = np.array([])
-Li_array = np.array([])
-Hi_array = np.array([])
-
-for i in I:
-	xi = x[i].value
-	yi = y[i].value
-	Li = L[i]
-	Hi = H[i]
-	xi_array = np.append(xi_array, xi)
-	yi_array = np.append(yi_array, yi)
-	Li_array = np.append(Li_array, Li)
-	Hi_array = np.append(Hi_array, Hi)
-
-xi_array = xi_array.reshape(1, np.shape(xi_array)[0])
-yi_array = yi_array.reshape(1, np.shape(yi_array)[0])
-
-	
-Xi_array = np.vstack((xi_array, xi_array + Li_array, xi_array + Li_array, xi_array))	
-Yi_array = np.vstack((yi_array, yi_array           , yi_array - Hi_array, yi_array - Hi_array))	
-	
-import matplotlib.pyplot as plt	
-	
-p1 = plt.fill(Xi_array, Yi_array)	
+# > Results extraction. Positions and dimensions of all the rectangles are
+#   pulled into preallocated arrays in a single pass
+def extract_layout(I, x, y, L, H):
+	n_rect = len(I)
+	xi_array = np.fromiter((x[i].value for i in I), dtype = float, count = n_rect)
+	yi_array = np.fromiter((y[i].value for i in I), dtype = float, count = n_rect)
+	Li_array = np.fromiter((L[i] for i in I), dtype = float, count = n_rect)
+	Hi_array = np.fromiter((H[i] for i in I), dtype = float, count = n_rect)
+	return xi_array, yi_array, Li_array, Hi_array
+
+xi_array, yi_array, Li_array, Hi_array = extract_layout(I, x, y, L, H)
+
+# > Corners of every rectangle (upper left, upper right, lower right, lower left)
+#   as an array of shape (rectangles, 4, 2)
+Xi_array = np.column_stack((xi_array, xi_array + Li_array, xi_array + Li_array, xi_array))
+Yi_array = np.column_stack((yi_array, yi_array           , yi_array - Hi_array, yi_array - Hi_array))
+corners  = np.dstack((Xi_array, Yi_array))
+
+import matplotlib.pyplot as plt
+from matplotlib.collections import PolyCollection
+
+# > All the rectangles are drawn as a single patch collection
+fig, ax = plt.subplots()
+p1 = ax.add_collection(PolyCollection(corners, facecolors = plt.cm.tab20(np.arange(len(I)) % 20), edgecolors = 'k'))
+ax.set_xlim(0, lt.value)
+ax.set_ylim(0, W)
 plt.show()
-
-	
-	
-	
-	
-	
-	
-	
-	
-	
-	
@@ -0,0 +1,51 @@
+"""
+*-------------------------------------------------------------------------------------
+*                           #### STRIP-PACKING 2D - SHELF HEURISTIC ####
+*-------------------------------------------------------------------------------------
+
+  Fast constructive layout used to seed the MILP of strip_packing_2D_problem.py
+
+  The strip is filled with vertical shelves (columns). Rectangles are taken
+  by decreasing length (and height) and each one is placed in the first shelf
+  with enough free height left. When none fits a new shelf is opened at the
+  end of the strip, as long as the rectangle that opens it.
+
+  The length of the layout is a valid upper bound for the length of the
+  strip, and the layout itself is a feasible starting point (MIP start).
+
+  Identical rectangles keep their order, so the layout also satisfies the
+  symmetry breaking constraints x[i] <= x[j] of the model.
+
+"""
+
+
+def shelf_packing(rectangles, L, H, W):
+	"""
+	rectangles: list of rectangle names. L, H: dicts with their length and height.
+	W: width of the strip.
+	Returns x, y (upper left corner of every rectangle, as in the model) and
+	the length of the layout.
+	"""
+	order = sorted(rectangles, key = lambda i: (-L[i], -H[i]))
+
+	shelf_x      = []   # x position of every shelf
+	shelf_length = []   # length of every shelf (length of its first rectangle)
+	shelf_height = []   # height already used in every shelf
+
+	x = {}
+	y = {}
+	for i in order:
+		for s in range(len(shelf_x)):
+			if shelf_height[s] + H[i] <= W and L[i] <= shelf_length[s]:
+				break
+		else:
+			s = len(shelf_x)
+			shelf_x.append(sum(shelf_length))
+			shelf_length.append(L[i])
+			shelf_height.append(0)
+
+		x[i] = shelf_x[s]
+		y[i] = shelf_height[s] + H[i]
+		shelf_height[s] += H[i]
+
+	return x, y, sum(shelf_length)
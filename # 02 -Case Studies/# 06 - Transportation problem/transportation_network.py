@@ -0,0 +1,470 @@
+"""
+------------------------------------------------------------------------------------
+                 ####  TRANSPORT LP - NETWORK SIMPLEX #####
+------------------------------------------------------------------------------------
+
+  The transport LP of transportation_problem.py is a bipartite min-cost flow
+  problem. Instead of writing it to a file and calling a general LP solver,
+  solve_transportation(m) recognizes that structure in the model:
+
+      - one linear objective to minimize, with costs c[i,j] >= 0
+      - non negative variables x[i,j] without upper bound
+      - supply constraints   sum(x[i,j] for j) <= a[i]
+      - demand constraints   sum(x[i,j] for i) >= b[j]
+      - every variable appears in exactly one supply and one demand constraint
+
+  and solves it with the transportation simplex (MODI method) on NumPy
+  arrays. A dummy market with zero cost takes the surplus capacity. The
+  initial basis comes from the least cost rule. Every iteration computes
+  the potentials u[i], v[j] on the basis tree, prices all the arcs at once
+  (c - u - v) and pivots around the cycle of the most negative arc.
+
+  The flows are written back into x[i,j] and the potentials into the dual
+  suffix of the model (m.dual, created if needed): u[i] <= 0 for the supply
+  constraints and v[j] >= 0 for the demand constraints. Reduced costs are
+  written into m.rc when the model has that suffix. Any other model (side
+  constraints, negative costs, ...) is solved as an LP with the given solver.
+
+  sensitivity_report(m) gives the ranging of a, b and c of the solved model
+  (allowable increase / decrease that keep the final basis optimal), worked
+  out on the basis tree without solving the model again.
+
+  Usage:
+      from transportation_network import solve_transportation
+      results = solve_transportation(m, engine = 'network', solver = 'glpk')
+
+"""
+
+
+import numpy as np
+from  pyomo.environ import *
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition
+from pyomo.repn import generate_standard_repn
+
+
+# 01 # Transportation simplex on arrays
+def _rooted_tree(adj, C, m, n):
+	# Basis tree rooted at plant 0 (parent, depth and children of every node)
+	# and potentials u[0] = 0, c[i,j] = u[i] + v[j] on every basic cell
+	parent    = [None] * (m + n)
+	depth     = [0] * (m + n)
+	children  = [set() for node in range(m + n)]
+	potential = [None] * (m + n)
+	potential[0] = 0.0
+	pending = [0]
+	while pending:
+		node = pending.pop()
+		for other in adj[node]:
+			if potential[other] is None:
+				i, j = (node, other - m) if node < m else (other, node - m)
+				potential[other] = C[i, j] - potential[node]
+				parent[other] = node
+				depth[other] = depth[node] + 1
+				children[node].add(other)
+				pending.append(other)
+	return parent, depth, children, np.array(potential[:m]), np.array(potential[m:])
+
+
+def _tree_path(parent, depth, start, end):
+	# Nodes on the tree path from start to end, climbing from both ends to
+	# their common ancestor. Also returns the position of the ancestor
+	up_start, up_end = [start], [end]
+	while start != end:
+		if depth[start] >= depth[end]:
+			start = parent[start]
+			up_start.append(start)
+		else:
+			end = parent[end]
+			up_end.append(end)
+	return up_start + up_end[-2::-1], len(up_start) - 1
+
+
+def _simplex(a, b, C, tol = 1e-9, max_iter = None, X0 = None):
+	"""
+	Transportation simplex on the balanced problem: a dummy market (last
+	column) takes the surplus capacity. X0 are the (m, n) flows of a known
+	solution to start from; by default the least cost rule is used.
+	Returns the flows X and potentials u, v with the dummy market, the costs
+	C with big-M in the missing arcs, the mask of those arcs and the basis
+	(set of cells and its tree: parent, depth and children of every node).
+	"""
+	a = np.asarray(a, dtype = float)
+	b = np.asarray(b, dtype = float)
+	C = np.asarray(C, dtype = float)
+	m, n_real = C.shape
+
+	surplus = a.sum() - b.sum()
+	if surplus < -tol * max(1, a.sum()):
+		raise ValueError('total demand exceeds total capacity')
+
+	# > Dummy market with the surplus capacity, and big-M for the missing arcs
+	b = np.append(b, max(surplus, 0))
+	C = np.hstack((C, np.zeros((m, 1))))
+	n = n_real + 1
+	forbidden = ~np.isfinite(C)
+	M = (np.abs(C[~forbidden]).max() + 1) * (m + n)
+	C[forbidden] = M
+
+	# > Initial basis. Least cost rule (or the cells with flow in X0),
+	#   completed with zero flows to a spanning tree
+	X = np.zeros((m, n))
+	supply = a.copy()
+	demand = b.copy()
+	adj = {node: set() for node in range(m + n)}
+	root = list(range(m + n))
+
+	def find(node):
+		while root[node] != node:
+			root[node] = root[root[node]]
+			node = root[node]
+		return node
+
+	basis = []
+	order = np.argsort(C, axis = None, kind = 'stable')
+	if X0 is not None:
+		X[:, :n_real] = X0
+		X[:, -1] = np.maximum(a - X[:, :n_real].sum(axis = 1), 0)
+		X[X < tol * max(1, a.max())] = 0
+		if np.abs(X.sum(axis = 0) - b).max() > tol * max(1, b.max()):
+			raise ValueError('the flows of X0 do not meet the demand exactly')
+		for i, j in zip(*np.nonzero(X)):
+			if find(i) == find(m + j):
+				raise ValueError('the flows of X0 are not a basic solution')
+			basis.append((int(i), int(j)))
+			root[find(i)] = find(m + j)
+		order_flows = []
+	else:
+		order_flows = order.tolist()
+	pending_markets = int((demand > 0).sum())
+	for k in order_flows:
+		i, j = divmod(k, n)
+		if supply[i] <= 0 or demand[j] <= 0:
+			continue
+		q = min(supply[i], demand[j])
+		X[i,j] = q
+		supply[i] -= q
+		demand[j] -= q
+		basis.append((i, j))
+		root[find(i)] = find(m + j)
+		if demand[j] <= 0:
+			pending_markets -= 1
+			if pending_markets == 0:
+				break
+	for k in order.tolist():
+		if len(basis) == m + n - 1:
+			break
+		i, j = divmod(k, n)
+		if find(i) != find(m + j):
+			basis.append((i, j))
+			root[find(i)] = find(m + j)
+	for i, j in basis:
+		adj[i].add(m + j)
+		adj[m + j].add(i)
+	basis = set(basis)
+
+	# > Pivoting. The basis is kept as a tree rooted at plant 0 and the
+	#   potentials are computed once and then updated on every pivot
+	parent, depth, children, u, v = _rooted_tree(adj, C, m, n)
+	scale = max(1, np.abs(C).max())
+	n_candidates = 50 + (m + n) // 4
+	cand_i = cand_j = np.zeros(0, dtype = int)
+	for it in range(max_iter or 50 * (m + n) + 1000):
+		# Candidate list pricing. The arcs with the most negative reduced cost
+		# are kept and re-priced (cheap) until none of them is attractive;
+		# only then all the arcs are priced again
+		r_cand = C[cand_i, cand_j] - u[cand_i] - v[cand_j]
+		if not len(r_cand) or r_cand.min() >= -tol * scale:
+			R = (C - u[:, None] - v[None, :]).ravel()
+			negative = np.flatnonzero(R < -tol * scale)
+			if not len(negative):
+				break
+			if len(negative) > n_candidates:
+				negative = negative[np.argpartition(R[negative], n_candidates)[:n_candidates]]
+			cand_i, cand_j = np.divmod(negative, n)
+			r_cand = R[negative]
+		k = int(r_cand.argmin())
+		i0, j0 = int(cand_i[k]), int(cand_j[k])
+		delta = r_cand[k]
+
+		# Cycle: entering cell (+) and the tree path from market j0 to plant i0
+		path, top = _tree_path(parent, depth, m + j0, i0)
+		cells = [(q, p - m) if p >= m else (p, q - m) for p, q in zip(path[:-1], path[1:])]
+		minus = cells[0::2]
+		plus  = cells[1::2] + [(i0, j0)]
+
+		theta = min(X[c] for c in minus)
+		leaving = next(c for c in minus if X[c] == theta)
+		for c in plus:
+			X[c] += theta
+		for c in minus:
+			X[c] -= theta
+		X[leaving] = 0
+		basis.remove(leaving)
+		basis.add((i0, j0))
+
+		# Leaving the basis cuts off the subtree below the leaving cell. It
+		# hangs again from the entering cell: the path from the entering node
+		# up to the cut is reversed
+		row, col = leaving[0], m + leaving[1]
+		child = row if parent[row] == col else col
+		if path.index(child) < top:
+			node, other, sign = m + j0, i0, 1       # market j0 side is cut off
+		else:
+			node, other, sign = i0, m + j0, -1      # plant i0 side is cut off
+		children[parent[child]].discard(child)
+		new_parent = other
+		while True:
+			old_parent = parent[node]
+			parent[node] = new_parent
+			children[new_parent].add(node)
+			if node == child:
+				break
+			children[old_parent].discard(node)
+			new_parent, node = node, old_parent
+
+		# Only the potentials of the subtree change, by the reduced cost of
+		# the entering cell. Its depths are updated on the same traversal
+		root = m + j0 if sign == 1 else i0
+		depth[root] = depth[other] + 1
+		side = [root]
+		pending = [root]
+		while pending:
+			node = pending.pop()
+			for below in children[node]:
+				depth[below] = depth[node] + 1
+				side.append(below)
+				pending.append(below)
+		side = np.array(side)
+		u[side[side < m]] -= sign * delta
+		v[side[side >= m] - m] += sign * delta
+	else:
+		raise RuntimeError('transportation simplex did not converge')
+
+	if (X[forbidden] > tol).any():
+		raise ValueError('no feasible flow with the existing arcs')
+
+	# > Duals of the original LP: u <= 0 (capacity) and v >= 0 (demand).
+	#   The dummy market has zero cost, so its potential is taken as 0
+	u, v = u + v[-1], v - v[-1]
+
+	return X, u, v, C, forbidden, basis, (parent, depth, children)
+
+
+def transportation_simplex(a, b, C, tol = 1e-9, max_iter = None):
+	"""
+	a: supply of the m plants. b: demand of the n markets. C: (m, n) costs,
+	np.inf for the arcs that do not exist.
+	Returns the flows X (m, n), the duals u (m), v (n) and the list of basic
+	cells. Raises ValueError when there is no feasible flow.
+	"""
+	X, u, v, C, forbidden, basis, tree = _simplex(a, b, C, tol, max_iter)
+	n_real = X.shape[1] - 1
+	return X[:, :n_real], u, v[:n_real], sorted((i, j) for (i, j) in basis if j < n_real)
+
+
+# 02 # Structure detection in the Pyomo model
+def _network_structure(m):
+	objectives = list(m.component_data_objects(Objective, active = True))
+	if len(objectives) != 1 or objectives[0].sense != minimize:
+		return None
+	obj = objectives[0]
+	repn = generate_standard_repn(obj.expr, quadratic = False)
+	if not repn.is_linear():
+		return None
+
+	supply, demand = [], []
+	side = {}
+	for con in m.component_data_objects(Constraint, active = True):
+		repn_c = generate_standard_repn(con.body, quadratic = False)
+		if not repn_c.is_linear() or any(coef != 1 for coef in repn_c.linear_coefs):
+			return None
+		if con.has_ub() and not con.has_lb():
+			rows, rhs = supply, value(con.upper) - repn_c.constant
+		elif con.has_lb() and not con.has_ub():
+			rows, rhs = demand, value(con.lower) - repn_c.constant
+		else:
+			return None
+		for var in repn_c.linear_vars:
+			entry = side.setdefault(id(var), [var, None, None])
+			if entry[1 + (rows is demand)] is not None:
+				return None
+			entry[1 + (rows is demand)] = len(rows)
+		rows.append((con, rhs))
+
+	variables = [var for var, i, j in side.values()]
+	cells = [(i, j) for var, i, j in side.values()]
+	if any(i is None or j is None for i, j in cells) or len(set(cells)) != len(cells):
+		return None
+	a = np.array([rhs for con, rhs in supply], dtype = float)
+	b = np.array([rhs for con, rhs in demand], dtype = float)
+	for var in variables:
+		if var.fixed or var.lb != 0 or var.ub is not None:
+			return None
+		if var.is_integer() and not (np.all(a == np.round(a)) and np.all(b == np.round(b))):
+			return None
+
+	cost = {id(var): coef for coef, var in zip(repn.linear_coefs, repn.linear_vars)}
+	if any(id(var) not in side for var in repn.linear_vars):
+		return None
+	C = np.full((len(a), len(b)), np.inf)
+	rows_c, cols_c = np.array(cells).T
+	C[rows_c, cols_c] = [cost.get(id(var), 0) for var in variables]
+	if (C[np.isfinite(C)] < 0).any():
+		return None
+
+	return obj, repn, supply, demand, variables, (rows_c, cols_c), a, b, C
+
+
+# 03 # Solve mode
+def solve_transportation(m, engine = 'network', solver = 'glpk', **kwargs):
+	structure = _network_structure(m) if engine == 'network' else None
+	if structure is None:
+		return SolverFactory(solver).solve(m, **kwargs)
+
+	obj, repn, supply, demand, variables, (rows_c, cols_c), a, b, C = structure
+	try:
+		X, u, v, basis = transportation_simplex(a, b, C)
+	except (ValueError, RuntimeError):
+		# Infeasible or degenerate cycling: the LP solver gives the final word
+		return SolverFactory(solver).solve(m, **kwargs)
+
+	# > Flows, duals and reduced costs back into the model
+	for var, f in zip(variables, X[rows_c, cols_c].tolist()):
+		var.set_value(f)
+
+	if not isinstance(m.component('dual'), Suffix):
+		m.dual = Suffix(direction = Suffix.IMPORT)
+	for (con, rhs), ui in zip(supply, u.tolist()):
+		m.dual[con] = ui
+	for (con, rhs), vj in zip(demand, v.tolist()):
+		m.dual[con] = vj
+	if isinstance(m.component('rc'), Suffix):
+		reduced = (C[rows_c, cols_c] - u[rows_c] - v[cols_c]).tolist()
+		for var, rc in zip(variables, reduced):
+			m.rc[var] = rc
+
+	objective = float((C[rows_c, cols_c] * X[rows_c, cols_c]).sum() + repn.constant)
+	results = SolverResults()
+	results.problem.name = m.name
+	results.problem.sense = minimize
+	results.problem.lower_bound = objective
+	results.problem.upper_bound = objective
+	results.problem.number_of_variables = len(variables)
+	results.problem.number_of_constraints = len(supply) + len(demand)
+	results.problem.number_of_objectives = 1
+	results.solver.name = 'transportation simplex (NumPy)'
+	results.solver.status = SolverStatus.ok
+	results.solver.termination_condition = TerminationCondition.optimal
+	return results
+
+
+# 04 # Sensitivity analysis from the final basis
+def _preorder(children, root):
+	# Entry and exit positions of every node in a depth first traversal:
+	# node x hangs below node y when tin[y] <= tin[x] < tout[y]
+	tin  = [0] * len(children)
+	tout = [0] * len(children)
+	counter = 0
+	pending = [(root, False)]
+	while pending:
+		node, done = pending.pop()
+		if done:
+			tout[node] = counter
+			continue
+		tin[node] = counter
+		counter += 1
+		pending.append((node, True))
+		pending.extend((below, False) for below in children[node])
+	return np.array(tin), np.array(tout)
+
+
+def sensitivity_report(m, tol = 1e-9):
+	"""
+	Ranging of the solved transport model without solving it again. The basis
+	is rebuilt from the flows in x[i,j] (cells with flow, completed with zero
+	flows to a spanning tree; degenerate pivots fix it if needed) and gives:
+	    a: dual, slack and allowable increase / decrease of every capacity
+	    b: dual, surplus and allowable increase / decrease of every demand
+	    c: flow, reduced cost and allowable increase / decrease of every cost
+	Returns a dict with one pandas DataFrame for each of them.
+	"""
+	import pandas as pd
+
+	structure = _network_structure(m)
+	if structure is None:
+		raise ValueError('the model is not a transportation problem')
+	obj, repn, supply, demand, variables, (rows_c, cols_c), a, b, C = structure
+	n_plants, n_markets = C.shape
+
+	X0 = np.zeros(C.shape)
+	X0[rows_c, cols_c] = [var.value for var in variables]
+	try:
+		X, u, v, C, forbidden, basis, (parent, depth, children) = _simplex(a, b, C, tol, X0 = X0)
+	except ValueError:
+		# The flows are not a basic solution (e.g. from an interior point
+		# method): an optimal basis is computed from scratch
+		X, u, v, C, forbidden, basis, (parent, depth, children) = _simplex(a, b, C, tol)
+
+	R = C - u[:, None] - v[None, :]
+	R[forbidden] = np.inf
+	dummy = n_plants + n_markets          # node of the dummy market
+
+	# > Costs. A basic cost can change until a non basic arc that links the
+	#   two parts of the tree split by its cell reaches a zero reduced cost,
+	#   or until the dual of a demand on the side of the tree that moves
+	#   (the one without the dummy market) would become negative
+	c_increase = np.full(C.shape, np.inf)
+	c_decrease = R.copy()
+	tin, tout = _preorder(children, 0)
+	for (i, j) in basis:
+		if j == n_markets:
+			continue
+		child = i if parent[i] == n_plants + j else n_plants + j
+		below = (tin >= tin[child]) & (tin < tout[child])
+		rows_below, cols_below = below[:n_plants], below[n_plants:]
+		R[i, j] = np.inf
+		into_below = R[np.ix_(~rows_below, cols_below)]
+		from_below = R[np.ix_(rows_below, ~cols_below)]
+		R[i, j] = 0
+		into_below = into_below.min() if into_below.size else np.inf
+		from_below = from_below.min() if from_below.size else np.inf
+		moving = ~cols_below[:n_markets] if cols_below[-1] else cols_below[:n_markets]
+		v_min = v[:n_markets][moving].min() if moving.any() else np.inf
+		if child >= n_plants:
+			c_increase[i, j], c_decrease[i, j] = into_below, from_below
+		else:
+			c_increase[i, j], c_decrease[i, j] = from_below, into_below
+		if cols_below[j] == (not cols_below[-1]):
+			c_decrease[i, j] = min(c_decrease[i, j], v_min)   # v of market j side goes down
+		else:
+			c_increase[i, j] = min(c_increase[i, j], v_min)
+
+	# > Capacities and demands. A change of the right hand side is sent along
+	#   the tree path to the dummy market; the basis holds until one of the
+	#   decreasing flows on the path reaches zero
+	def rhs_range(node):
+		path, top = _tree_path(parent, depth, node, dummy)
+		cells = [(q, p - n_plants) if p >= n_plants else (p, q - n_plants)
+		         for p, q in zip(path[:-1], path[1:])]
+		increase = min([X[c] for c in cells[1::2]], default = np.inf)
+		decrease = min([X[c] for c in cells[0::2]], default = np.inf)
+		return increase, decrease
+
+	a_range = np.array([rhs_range(i) for i in range(n_plants)]).reshape(-1, 2)
+	b_range = np.array([rhs_range(n_plants + j) for j in range(n_markets)]).reshape(-1, 2)
+
+	report = {}
+	report['a'] = pd.DataFrame({'capacity': a, 'dual': u, 'slack': X[:, -1],
+	                            'allowable increase': a_range[:, 0],
+	                            'allowable decrease': a_range[:, 1]},
+	                           index = [con.index() for con, rhs in supply])
+	report['b'] = pd.DataFrame({'demand': b, 'dual': v[:n_markets], 'surplus': X[:, :n_markets].sum(axis = 0) - b,
+	                            'allowable increase': b_range[:, 0],
+	                            'allowable decrease': b_range[:, 1]},
+	                           index = [con.index() for con, rhs in demand])
+	report['c'] = pd.DataFrame({'cost': C[rows_c, cols_c], 'flow': X[rows_c, cols_c],
+	                            'reduced cost': R[rows_c, cols_c],
+	                            'allowable increase': c_increase[rows_c, cols_c],
+	                            'allowable decrease': c_decrease[rows_c, cols_c]},
+	                           index = pd.Index([var.index() for var in variables], tupleize_cols = False))
+	return report
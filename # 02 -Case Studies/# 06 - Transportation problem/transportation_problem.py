@@ -12,9 +12,16 @@ http://www.un.org/en/development/desa/policy/mdg_workshops/training_material/gam
 
 
 
+import os
+import sys
 from six import iteritems
 from  pyomo.environ import *
 
+from transportation_network import solve_transportation, sensitivity_report
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from solver_memoria import solver_en_memoria
+
 
 m = ConcreteModel()
 
@@ -91,5 +98,27 @@ m.Cost = Objective(rule = objective_rule,
 
 
 """ # 06 # Solver Call"""
-SolverFactory("glpk").solve(m, tee=True)
+# > Duals of supply / demand and reduced costs of x are imported with the solution
+m.dual = Suffix(direction = Suffix.IMPORT)
+m.rc   = Suffix(direction = Suffix.IMPORT)
+
+# > The model is a bipartite network flow problem and is solved with the
+#   transportation simplex of transportation_network.py. Use engine = 'lp'
+#   to send it as a general LP to HiGHS in memory (or glpk if HiGHS is not
+#   installed)
+solve_transportation(m, engine = 'network', solver = solver_en_memoria(alternativa = 'glpk'), tee = True)
 m.display()
+
+
+""" # 07 # Marginal values and ranging (from the final basis, no re-solve)"""
+print('\nMarginal values of supply / demand and reduced costs of x')
+m.dual.display()
+m.rc.display()
+
+# > Allowable increase / decrease of a, b and c that keep the basis optimal.
+#   Inside these ranges the cost changes at the rate given by the dual (a, b)
+#   or by the shipment (c)
+report = sensitivity_report(m)
+for name in ['a', 'b', 'c']:
+	print('\nRanging of {0}: {1}'.format(name, m.component(name).doc))
+	print(report[name].to_string())
@@ -0,0 +1,198 @@
+"""
+------------------------------------------------------------------------------------
+                 ####  EXAMPLE - TRANSPORT LP. SCENARIOS #####
+------------------------------------------------------------------------------------
+
+  Solves the transport LP of transportation_problem.py under many
+  capacity / demand / cost scenarios.
+
+  Every worker process builds the model only once, with mutable parameters
+  a, b and c. For each scenario only the coefficients that differ from the
+  ones of the previous solve are updated before solving again.
+
+  Scenarios are streamed from a CSV file in chunks, one row per scenario.
+  The first column is the scenario name and every other column overrides a
+  coefficient of the base data:
+
+      scenario, a[seattle], b[new-york], c[seattle,topeka], ...
+      high_ny,          ,          400,                  ,
+      ...
+
+  Empty cells keep the base value. Scenarios are sent to the workers in
+  windows of a fixed size, so only one window is in memory at a time. The
+  cost and the shipments of every scenario are appended to the results CSV
+  (one row per scenario) as soon as its window is solved.
+
+  Usage:
+      python transportation_scenarios.py [scenarios.csv] [results.csv] [solver]
+
+"""
+
+
+import os
+import sys
+from itertools import islice
+from multiprocessing import Pool
+
+from  pyomo.environ import *
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from solver_memoria import solver_en_memoria
+
+
+""" # 01 # Base data (same instance as transportation_problem.py)"""
+plants  = ['seattle', 'san-diego']
+markets = ['new-york', 'chicago', 'topeka']
+
+capacity_plant = {'seattle': 350, 'san-diego': 550}
+market_demand  = {'new-york': 325, 'chicago': 300, 'topeka': 275}
+distance = {
+    ('seattle',  'new-york') : 2.5,
+    ('seattle',  'chicago')  : 1.7,
+    ('seattle',  'topeka')   : 1.8,
+    ('san-diego','new-york') : 2.5,
+    ('san-diego','chicago')  : 1.8,
+    ('san-diego','topeka')   : 1.4,
+}
+transport_cost = {ij: 90 * d / 1000 for ij, d in distance.items()}
+
+
+""" # 02 # Model with mutable parameters"""
+def build_model():
+	m = ConcreteModel()
+
+	I = m.I = Set( initialize = plants, doc = "canning plants")
+	J = m.J = Set( initialize = markets, doc = "markets")
+
+	m.a = Param(I, initialize = capacity_plant, mutable = True, doc = 'capacity of plant i in cases')
+	m.b = Param(J, initialize = market_demand, mutable = True, doc = 'demand at market j in cases')
+	m.c = Param(I, J, initialize = transport_cost, mutable = True, doc = 'transport cost in thousand of dollars per case')
+
+	m.x = Var(I, J, domain = NonNegativeReals, doc = 'shipment quantities in cases' )
+
+	def supply_rule(m, i):
+		return sum(m.x[i,j] for j in J) <= m.a[i]
+	m.supply = Constraint(I, rule = supply_rule, doc = 'supply limit at plant i')
+
+	def demand_rule(m, j):
+		return sum(m.x[i,j] for i in I) >= m.b[j]
+	m.demand = Constraint(J, rule = demand_rule, doc = 'satisfy demand at market j')
+
+	def objective_rule(m):
+		return sum(m.c[i,j] * m.x[i,j] for i in I for j in J)
+	m.Cost = Objective(rule = objective_rule, sense = minimize)
+
+	return m
+
+
+# > Base value of every coefficient that a scenario can change
+base_values = {('a', (i,)): v for i, v in capacity_plant.items()}
+base_values.update({('b', (j,)): v for j, v in market_demand.items()})
+base_values.update({('c', ij): v for ij, v in transport_cost.items()})
+
+
+# > Columns of the results table
+result_columns = ['scenario', 'status', 'updated', 'cost'] + \
+                 ['x[{0},{1}]'.format(i, j) for i in plants for j in markets]
+
+
+def parse_column(column):
+	# 'c[seattle,topeka]' -> ('c', ('seattle', 'topeka'))
+	name, index = column.rstrip(']').split('[')
+	return name.strip(), tuple(s.strip() for s in index.split(','))
+
+
+""" # 03 # Worker state. Every process keeps its model, the solver and the
+           values of the coefficients used in its last solve"""
+_model   = None
+_opt     = None
+_current = None
+_solver  = 'glpk'
+
+
+def init_worker(solver):
+	global _solver
+	_solver = solver
+
+
+def solve_scenario(scenario):
+	name, overrides = scenario
+
+	global _model, _opt, _current
+	if _model is None:
+		_model   = build_model()
+		_opt     = SolverFactory(_solver)
+		_current = dict(base_values)
+
+	# > Only the coefficients that change with respect to the last solve are updated
+	target = dict(base_values)
+	target.update(overrides)
+	updated = 0
+	for key, v in target.items():
+		if _current[key] != v:
+			param, index = key
+			_model.component(param)[index if len(index) > 1 else index[0]] = v
+			_current[key] = v
+			updated += 1
+
+	results = _opt.solve(_model, load_solutions = False)
+	status  = results.solver.termination_condition
+
+	row = {'scenario': name, 'status': str(status), 'updated': updated, 'cost': float('nan')}
+	if status == TerminationCondition.optimal:
+		_model.solutions.load_from(results)
+		row['cost'] = value(_model.Cost)
+		for (i, j) in _model.x:
+			row['x[{0},{1}]'.format(i, j)] = _model.x[i,j].value
+	return row
+
+
+""" # 04 # Scenario stream"""
+def read_scenarios(filename, chunksize = 1000):
+	for chunk in pd.read_csv(filename, index_col = 0, chunksize = chunksize, skipinitialspace = True):
+		columns = [parse_column(col) for col in chunk.columns]
+		for name, values in zip(chunk.index, chunk.itertuples(index = False)):
+			overrides = {key: float(v) for key, v in zip(columns, values) if v == v}   # NaN -> base value
+			unknown = set(overrides) - set(base_values)
+			if unknown:
+				raise ValueError('scenario {0}: unknown coefficients {1}'.format(name, sorted(unknown)))
+			yield str(name), overrides
+
+
+def windows(scenarios, size):
+	# Lists of at most size scenarios, read from the stream only when needed
+	scenarios = iter(scenarios)
+	window = list(islice(scenarios, size))
+	while window:
+		yield window
+		window = list(islice(scenarios, size))
+
+
+# ======================================================================================
+#---------------------------------- SCENARIOS ------------------------------------------
+# ======================================================================================
+
+if __name__ == '__main__':
+
+	scenarios_file = sys.argv[1] if len(sys.argv) > 1 else 'transportation_scenarios.csv'
+	results_file   = sys.argv[2] if len(sys.argv) > 2 else 'transportation_scenarios_results.csv'
+	solver         = sys.argv[3] if len(sys.argv) > 3 else solver_en_memoria(alternativa = 'glpk')
+
+	window_size    = 1000     # scenarios in memory at a time
+
+	# > Each window is solved by the pool and written before the next one is
+	#   read, so memory does not grow with the number of scenarios
+	solved = not_optimal = 0
+	with Pool(initializer = init_worker, initargs = (solver,)) as pool:
+		with open(results_file, 'w', newline = '') as f:
+			pd.DataFrame(columns = result_columns).to_csv(f, index = False)
+			for window in windows(read_scenarios(scenarios_file), window_size):
+				rows = pd.DataFrame(pool.imap(solve_scenario, window, chunksize = 16), columns = result_columns)
+				rows.to_csv(f, header = False, index = False)
+				f.flush()
+				solved += len(rows)
+				not_optimal += int((rows['status'] != str(TerminationCondition.optimal)).sum())
+				print('{0} scenarios solved ({1} not optimal)'.format(solved, not_optimal))
+
+	print('Results written to', results_file)
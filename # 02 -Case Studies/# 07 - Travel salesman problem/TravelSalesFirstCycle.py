@@ -2,8 +2,14 @@
 #                     TRAVEL SALESMAN PROBLEM                           #
 # ===================================================================== #
 
+import os
+import sys
 from pyomo.environ import *
 
+# Solver en memoria (carpeta superior)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from solver_memoria import crear_solver_en_memoria
+
 '''
 Como vimos antes, se produjeron dos ciclos. Estos son:
   A->D->F->A  y  B->C->E->B
@@ -18,7 +24,7 @@ m = ConcreteModel(name = 'Knap-sack problem')
 ## SETS
 # Tenemos un set de ciudades y un alias de este set.
 c = m.c = Set(initialize = ['A','B','C','D','E','F'], ordered = True)
-cc = m.cc = SetOf(c, ordered = True)
+cc = m.cc = SetOf(c)
 
 # Añadimos sets para los ciclos:
 SS1 = m.SS1 = Set(initialize = ['A','D','F'], within = c)
@@ -38,41 +44,51 @@ for s in RelDic:
     for ss in RelDic[s]:
         R.add((s,ss))
 
+# Para cada ciudad guardamos a qué ciudades se puede ir (sucesores) y desde
+# qué ciudades se puede llegar (predecesores). Se calcula una sola vez a
+# partir de la relación, así las restricciones solo recorren los arcos que existen.
+sucesores = {ciudad: [] for ciudad in c}
+predecesores = {cciudad: [] for cciudad in cc}
+for ciudad, cciudad in R:
+    sucesores[ciudad].append(cciudad)
+    predecesores[cciudad].append(ciudad)
+
 ## PARÁMETROS
-# Como parámetros, tenemos las distancias entre las ciudades. A las que no existen
-# pondremos un cero.
+# Como parámetros, tenemos las distancias entre las ciudades. Solo se definen
+# para los trayectos que existen.
 DistDic = {}
 DistList = [8,3,4,8,1,5,9,1,7,2,21,3,5,7,3, 9,2,35,4,21,3,35,5]
 for n,i in enumerate(R):
     DistDic[i] = DistList[n]
 
-Cf = m.Cf = Param(c,cc, initialize = DistDic, default = 0)
+Cf = m.Cf = Param(R, initialize = DistDic)
 
 ## VARIABLES
 # Necesitamos una binaria que nos indique si se va de una ciudad c a una ciudad cc.
-y = m.y = Var(c,cc, domain = Binary)
+# Solo existe para los trayectos de la relación R.
+y = m.y = Var(R, domain = Binary)
 
 ## RESTRICCIONES
 # Hay que poner las restricciones
 
 #- De todas las ciudades, debe llegar a una
 def Llegada(m,ciudad):
-    return sum(y[ciudad,cciudad] for cciudad in cc if (ciudad,cciudad) in R) == 1
+    return sum(y[ciudad,cciudad] for cciudad in sucesores[ciudad]) == 1
 R1 = m.r1 = Constraint(c, rule = Llegada)
 
 #- A todas las ciudades, debe llegar a una.
 def Ida(m, cciudad):
-    return sum(y[ciudad,cciudad] for ciudad in c if (ciudad,cciudad) in R) == 1
+    return sum(y[ciudad,cciudad] for ciudad in predecesores[cciudad]) == 1
 R2 = m.r2 = Constraint(cc, rule = Ida)
 
 # - Ruptura de ciclo 1
 def Ruptura1(m):
-    return sum(y[ciudad,cciudad] for ciudad in c for cciudad in cc if ciudad in SS1 and cciudad not in SS1) >= 1
+    return sum(y[ciudad,cciudad] for ciudad in SS1 for cciudad in sucesores[ciudad] if cciudad not in SS1) >= 1
 RC1 = m.rc1 = Constraint(rule = Ruptura1)
 
 # - Ruptura de ciclo 2
 def Ruptura2(m):
-    return sum(y[ciudad,cciudad] for ciudad in c for cciudad in cc if ciudad in SS2 and cciudad not in SS2) >= 1
+    return sum(y[ciudad,cciudad] for ciudad in SS2 for cciudad in sucesores[ciudad] if cciudad not in SS2) >= 1
 RC2 = m.rc2 = Constraint(rule = Ruptura2)
 
 
@@ -80,13 +96,14 @@ RC2 = m.rc2 = Constraint(rule = Ruptura2)
 ## OBJETIVO
 # El objetivo es minimizar la distancia recorrida.
 def fobj(m):
-    return sum(Cf[ciudad,cciudad]*y[ciudad,cciudad] for ciudad in c for cciudad in cc)
+    return sum(Cf[ciudad,cciudad]*y[ciudad,cciudad] for (ciudad,cciudad) in R)
 OBJ = m.obj = Objective(rule = fobj, sense = minimize)
 
 
 ## VERBATIM DE RESOLUCIÓN
 from pyomo.opt import SolverFactory
-opt = SolverFactory('glpk')
+# HiGHS en memoria (sin archivos ni procesos) o glpk si no está instalado
+opt = crear_solver_en_memoria(alternativa = 'glpk')
 results = opt.solve(m)
 results.write()
 
@@ -0,0 +1,189 @@
+# ===================================================================== #
+#                     TRAVEL SALESMAN PROBLEM                           #
+#                 (Ruptura automática de ciclos)                        #
+# ===================================================================== #
+
+import os
+import sys
+from pyomo.environ import *
+
+# Solver en memoria (carpeta superior)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from solver_memoria import crear_solver_en_memoria
+
+'''
+En TravelSalesFirstCycle.py y TravelSalesSecondCycle.py los ciclos se
+rompían a mano: se leía la solución, se buscaban los ciclos y se escribía
+un nuevo archivo con sus sets y restricciones.
+
+Aquí se hace de forma automática. Se resuelve el modelo de TravelSales.py,
+se buscan todos los ciclos de la solución recorriendo el grafo de "y" una
+sola vez y se añaden a una ConstraintList únicamente los cortes violados.
+Se repite hasta que solo queda un ciclo que pasa por todas las ciudades.
+
+Si se usa un solver persistente ('gurobi_persistent', 'cplex_persistent',
+...), el modelo se carga en el solver una sola vez. En cada ronda solo se
+le envían los cortes nuevos y la solución anterior se usa como punto de
+partida (warm start), así que el coste de cada iteración crece con el
+número de cortes y no con el tamaño del modelo.
+'''
+
+## DEFINICION DEL MODELO
+# El modelo será un modelo concreto.
+m = ConcreteModel(name = 'Travel salesman problem')
+
+## SETS
+# Tenemos un set de ciudades y un alias de este set.
+c = m.c = Set(initialize = ['A','B','C','D','E','F'], ordered = True)
+cc = m.cc = SetOf(c)
+
+# Tenemos tambien una relación que nos permite decidir que ciudades están
+# comunicadas con qué ciudades. El trayecto F -> F de los otros archivos no se
+# incluye: un bucle sobre la misma ciudad no es un trayecto.
+RelDic = {'A': ('B','D','F'),
+          'B': ('A','C','D','E'),
+          'C': ('B','D','E','F'),
+          'D': ('A','B','C','F'),
+          'E': ('B','C','F'),
+          'F': ('A','C','D','E')}
+
+R = m.R = Set(within = c*cc, ordered = True)
+for s in RelDic:
+    for ss in RelDic[s]:
+        R.add((s,ss))
+
+# Para cada ciudad guardamos a qué ciudades se puede ir (sucesores) y desde
+# qué ciudades se puede llegar (predecesores). Se calcula una sola vez a
+# partir de la relación, así las restricciones solo recorren los arcos que existen.
+sucesores = {ciudad: [] for ciudad in c}
+predecesores = {cciudad: [] for cciudad in cc}
+for ciudad, cciudad in R:
+    sucesores[ciudad].append(cciudad)
+    predecesores[cciudad].append(ciudad)
+
+## PARÁMETROS
+# Como parámetros, tenemos las distancias entre las ciudades. Solo se definen
+# para los trayectos que existen.
+DistDic = {}
+DistList = [8,3,4,8,1,5,9,1,7,2,21,3,5,7,3, 9,2,35,4,21,3,35]
+for n,i in enumerate(R):
+    DistDic[i] = DistList[n]
+
+Cf = m.Cf = Param(R, initialize = DistDic, doc = 'Distancia entre las ciudades')
+
+## VARIABLES
+# Necesitamos una binaria que nos indique si se va de una ciudad c a una ciudad cc.
+# Solo existe para los trayectos de la relación R.
+y = m.y = Var(R, domain = Binary, doc = 'Indica si se hace el trayecto de "c" a "cc"')
+
+## RESTRICCIONES
+# Hay que poner las restricciones
+
+#- De todas las ciudades, debe llegar a una
+def Llegada(m,ciudad):
+    return sum(y[ciudad,cciudad] for cciudad in sucesores[ciudad]) == 1
+R1 = m.r1 = Constraint(c, rule = Llegada, doc = 'Desde todas las ciudades debe llegar a una')
+
+#- A todas las ciudades, debe llegar a una.
+def Ida(m, cciudad):
+    return sum(y[ciudad,cciudad] for ciudad in predecesores[cciudad]) == 1
+R2 = m.r2 = Constraint(cc, rule = Ida, doc = 'De todas las ciudades, debe llegar de una')
+
+#- Ruptura de ciclos. Empieza vacía y se va llenando con los cortes violados.
+RC = m.cortes = ConstraintList(doc = 'Ruptura de ciclos')
+
+## OBJETIVO
+# El objetivo es minimizar la distancia recorrida.
+def fobj(m):
+    return sum(Cf[ciudad,cciudad]*y[ciudad,cciudad] for (ciudad,cciudad) in R)
+OBJ = m.obj = Objective(rule = fobj, sense = minimize, doc = 'Distancia recorrida')
+
+## DETECCIÓN DE CICLOS
+# Cada ciudad tiene exactamente un trayecto de salida en la solución, así que
+# basta con seguir los sucesores para recorrer cada ciclo. Cada ciudad se
+# visita una sola vez, por lo que el coste es lineal en el número de arcos.
+def ciclos(y):
+    siguiente = {}
+    for ciudad, cciudad in R:
+        if value(y[ciudad,cciudad]) > 0.5:
+            siguiente[ciudad] = cciudad
+
+    visitadas = set()
+    encontrados = []
+    for inicio in c:
+        if inicio in visitadas:
+            continue
+        ciclo = []
+        ciudad = inicio
+        while ciudad not in visitadas:
+            visitadas.add(ciudad)
+            ciclo.append(ciudad)
+            ciudad = siguiente[ciudad]
+        encontrados.append(ciclo)
+    return encontrados
+
+# Para cada ciclo S se obliga a salir de él al menos una vez. Solo se
+# recorren los arcos que salen de las ciudades del ciclo.
+def Ruptura(ciclo):
+    S = set(ciclo)
+    return sum(y[ciudad,cciudad] for ciudad in ciclo
+               for cciudad in sucesores[ciudad] if cciudad not in S) >= 1
+
+## VERBATIM DE RESOLUCIÓN
+from pyomo.opt import TerminationCondition
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
+
+# Con 'glpk' se escribe y se resuelve el modelo completo en cada iteración.
+# Con un solver persistente el modelo se carga una sola vez. El solver en
+# memoria (HiGHS, si está instalado) también recibe solo los cortes nuevos.
+opt = crear_solver_en_memoria(alternativa = 'glpk')
+persistente = isinstance(opt, PersistentSolver)
+if persistente:
+    opt.set_instance(m)
+
+# El warm start parte de los valores de "y" que dejó la resolución anterior.
+# Esa ruta viola los cortes nuevos, pero el solver la usa para reparar una
+# solución inicial en lugar de empezar desde cero.
+warmstart = opt.warm_start_capable()
+
+MaxIteraciones = 100
+for iteracion in range(1, MaxIteraciones + 1):
+    # La solución se carga después de comprobar el estado. Si el solver no
+    # llega al óptimo (infactible, límite de tiempo...), los valores de "y" no
+    # forman una ruta y no se pueden recorrer los ciclos.
+    if warmstart:
+        results = opt.solve(m, warmstart = True, load_solutions = False)
+    else:
+        results = opt.solve(m, load_solutions = False)
+    estado = results.solver.termination_condition
+    if estado != TerminationCondition.optimal:
+        raise RuntimeError('La iteración {0} ha terminado con estado {1}: no hay '
+                           'solución en la que buscar ciclos'.format(iteracion, estado))
+    if persistente:
+        opt.load_vars()
+    else:
+        m.solutions.load_from(results)
+    subtours = ciclos(y)
+    print('Iteración {0}: {1} ciclo(s) -> {2}'.format(iteracion, len(subtours), subtours))
+    if len(subtours) == 1:
+        break
+    for ciclo in subtours:
+        corte = RC.add(Ruptura(ciclo))
+        # Al solver persistente solo se le envía la restricción nueva
+        if persistente:
+            opt.add_constraint(corte)
+
+results.write()
+
+## LECTURA DE RESULTADOS
+# Solo hay ruta si un único ciclo pasa por todas las ciudades. Si se agotan
+# las iteraciones, la solución sigue teniendo subciclos y no es una ruta.
+if len(subtours) == 1 and len(subtours[0]) == len(c):
+    print('---------- CAMINO MÁS CORTO -------------')
+    ruta = subtours[0]
+    print(' -> '.join(ruta + ruta[:1]))
+    print('Distancia recorrida: ', OBJ.expr())
+else:
+    print('El método no ha convergido: tras {0} iteraciones quedan {1} ciclos'
+          .format(MaxIteraciones, len(subtours)))
+print('Cortes añadidos: ', len(RC))
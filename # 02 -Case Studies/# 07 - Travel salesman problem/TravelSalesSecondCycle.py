@@ -1,9 +1,16 @@
 # ===================================================================== #
 #                     TRAVEL SALESMAN PROBLEM                           #
 # ===================================================================== #
-import logging
+import os
+import sys
 from pyomo.environ import *
 
+# Funciones comunes de registro y exportación de resultados (carpeta superior)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from registro import crear_logger, archivar
+from exportar import exportar_resultados
+from solver_memoria import crear_solver_en_memoria
+
 '''
 Y aun quedan ciclos, así que se repite
 '''
@@ -16,7 +23,7 @@ m = ConcreteModel(name = 'Knap-sack problem')
 ## SETS
 # Tenemos un set de ciudades y un alias de este set.
 c = m.c = Set(initialize = ['A','B','C','D','E','F'], ordered = True)
-cc = m.cc = SetOf(c, ordered = True)
+cc = m.cc = SetOf(c)
 
 # Añadimos sets para los ciclos:
 SS1 = m.SS1 = Set(initialize = ['A','D','F'], within = c)
@@ -41,75 +48,78 @@ for s in RelDic:
     for ss in RelDic[s]:
         R.add((s,ss))
 
+# Para cada ciudad guardamos a qué ciudades se puede ir (sucesores) y desde
+# qué ciudades se puede llegar (predecesores). Se calcula una sola vez a
+# partir de la relación, así las restricciones solo recorren los arcos que existen.
+sucesores = {ciudad: [] for ciudad in c}
+predecesores = {cciudad: [] for cciudad in cc}
+for ciudad, cciudad in R:
+    sucesores[ciudad].append(cciudad)
+    predecesores[cciudad].append(ciudad)
+
 ## PARÁMETROS
-# Como parámetros, tenemos las distancias entre las ciudades. A las que no existen
-# pondremos un cero.
+# Como parámetros, tenemos las distancias entre las ciudades. Solo se definen
+# para los trayectos que existen.
 DistDic = {}
 DistList = [8,3,4,8,1,5,9,1,7,2,21,3,5,7,3, 9,2,35,4,21,3,35,5]
 for n,i in enumerate(R):
     DistDic[i] = DistList[n]
 
-Cf = m.Cf = Param(c,cc, initialize = DistDic, default = 0, doc = 'Distancia entre las ciudades')
+Cf = m.Cf = Param(R, initialize = DistDic, doc = 'Distancia entre las ciudades')
 
 ## VARIABLES
 # Necesitamos una binaria que nos indique si se va de una ciudad c a una ciudad cc.
-y = m.y = Var(c,cc, domain = Binary, doc = 'Indica si se hace el trayecto de "c" a "cc"')
+# Solo existe para los trayectos de la relación R.
+y = m.y = Var(R, domain = Binary, doc = 'Indica si se hace el trayecto de "c" a "cc"')
 
 ## RESTRICCIONES
 # Hay que poner las restricciones
 
 #- De todas las ciudades, debe llegar a una
 def Llegada(m,ciudad):
-    return sum(y[ciudad,cciudad] for cciudad in cc if (ciudad,cciudad) in R) == 1
+    return sum(y[ciudad,cciudad] for cciudad in sucesores[ciudad]) == 1
 R1 = m.r1 = Constraint(c, rule = Llegada, doc = 'Desde todas las ciudades debe llegar a una')
 
 #- A todas las ciudades, debe llegar a una.
 def Ida(m, cciudad):
-    return sum(y[ciudad,cciudad] for ciudad in c if (ciudad,cciudad) in R) == 1
+    return sum(y[ciudad,cciudad] for ciudad in predecesores[cciudad]) == 1
 R2 = m.r2 = Constraint(cc, rule = Ida, doc = 'De todas las ciudades, debe llegar de una')
 
 # - Ruptura de ciclo 1
 def Ruptura1(m):
-    return sum(y[ciudad,cciudad] for ciudad in c for cciudad in cc if ciudad in SS1 and cciudad not in SS1) >= 1
+    return sum(y[ciudad,cciudad] for ciudad in SS1 for cciudad in sucesores[ciudad] if cciudad not in SS1) >= 1
 RC1 = m.rc1 = Constraint(rule = Ruptura1, doc = 'Romper el ciclo [A,D,F]')
 
 # - Ruptura de ciclo 2
 def Ruptura2(m):
-    return sum(y[ciudad,cciudad] for ciudad in c for cciudad in cc if ciudad in SS2 and cciudad not in SS2) >= 1
+    return sum(y[ciudad,cciudad] for ciudad in SS2 for cciudad in sucesores[ciudad] if cciudad not in SS2) >= 1
 RC2 = m.rc2 = Constraint(rule = Ruptura2, doc = 'Romper el ciclo [B,C,E]')
 
 # - Ruptura de ciclo 3
 def Ruptura3(m):
-    return sum(y[ciudad,cciudad] for ciudad in c for cciudad in cc if ciudad in SS3 and cciudad not in SS3) >= 1
+    return sum(y[ciudad,cciudad] for ciudad in SS3 for cciudad in sucesores[ciudad] if cciudad not in SS3) >= 1
 RC3 = m.rc3 = Constraint(rule = Ruptura3, doc = 'Romper el ciclo [A,F]')
 
 # - Ruptura de ciclo 4
 def Ruptura4(m):
-    return sum(y[ciudad,cciudad] for ciudad in c for cciudad in cc if ciudad in SS4 and cciudad not in SS4) >= 1
+    return sum(y[ciudad,cciudad] for ciudad in SS4 for cciudad in sucesores[ciudad] if cciudad not in SS4) >= 1
 RC4 = m.rc4 = Constraint(rule = Ruptura4, doc = 'Romper el ciclo [B,D]')
 
 # - Ruptura de ciclo 5
 def Ruptura5(m):
-    return sum(y[ciudad,cciudad] for ciudad in c for cciudad in cc if ciudad in SS5 and cciudad not in SS5) >= 1
+    return sum(y[ciudad,cciudad] for ciudad in SS5 for cciudad in sucesores[ciudad] if cciudad not in SS5) >= 1
 RC5 = m.rc5 = Constraint(rule = Ruptura5, doc = 'Romper el ciclo [C,E]')
 
 ## OBJETIVO
 # El objetivo es minimizar la distancia recorrida.
 def fobj(m):
-    return sum(Cf[ciudad,cciudad]*y[ciudad,cciudad] for ciudad in c for cciudad in cc)
+    return sum(Cf[ciudad,cciudad]*y[ciudad,cciudad] for (ciudad,cciudad) in R)
 OBJ = m.obj = Objective(rule = fobj, sense = minimize, doc = 'Distancia recorrida')
 
-## FIJAR
-# Hay que fijar las que no esten en la relación a cero
-for ciudad in c:
-    for cciudad in cc:
-        if (ciudad,cciudad) not in R:
-            y[ciudad,cciudad] = 0
-            y[ciudad,cciudad].fixed = True
-
 ## VERBATIM DE RESOLUCIÓN
 from pyomo.opt import SolverFactory
-opt = SolverFactory('glpk')
+# HiGHS en memoria (sin archivos ni procesos) o glpk si no está instalado
+opt = crear_solver_en_memoria(alternativa = 'glpk')
 results = opt.solve(m)
 results.write()
 
@@ -122,28 +132,8 @@ for i,n in enumerate(y):
 
 
 ## LOGGING
-# Se crea el logger y se da el nivel
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-# Se crea el formateador
-formatter = logging.Formatter('%(message)s')
-# Se crea lo que tratará el archivo y se le asigna el formateador
-file_handler = logging.FileHandler(__file__[:-3] + '_Logging.log', mode='w')
-file_handler.setFormatter(formatter)
-# Se empieza a añadir cosas
-logger.addHandler(file_handler)
-
-# Creamos una función para acelerarlo:
-def archivar(x, tipo='constraint'):
-    parrafo = '\n{0}: {1} ----------------\n'.format(x, x.doc)
-    for i in x:
-        if tipo == 'constraint':
-            parrafo += '\n{0}'.format(x[i].expr)
-        elif tipo == 'parameter':
-            parrafo += '\n{0} = {1}'.format(i, x[i])
-        elif tipo == 'variable':
-            parrafo += '\n{0} = {1}'.format(i, x[i].value)
-    return parrafo
+# Se crea el logger. Las componentes se escriben línea a línea en el archivo
+logger = crear_logger(__name__, __file__[:-3] + '_Logging.log')
 
 logger.info(results)
 logger.info('\n========== OBJECTIVE FUNCTION ==========')
@@ -152,17 +142,24 @@ logger.info('\nEl valor de la función objetivo es: ')
 logger.info(OBJ.expr())
 logger.info('========================================')
 logger.info('\n============== PARAMETERS ==============')
-logger.info(archivar(Cf, tipo='parameter'))
+archivar(logger, Cf, tipo='parameter')
 logger.info('========================================')
 logger.info('\n============== CONSTRAINTS ==============')
-logger.info(archivar(R1))
-logger.info(archivar(R2))
-logger.info(archivar(RC1))
-logger.info(archivar(RC2))
-logger.info(archivar(RC3))
-logger.info(archivar(RC4))
-logger.info(archivar(RC5))
+archivar(logger, R1)
+archivar(logger, R2)
+archivar(logger, RC1)
+archivar(logger, RC2)
+archivar(logger, RC3)
+archivar(logger, RC4)
+archivar(logger, RC5)
 logger.info('=========================================')
 logger.info('\n==================================== VARIABLES ====================================')
-logger.info(archivar(y, tipo='variable'))
+archivar(logger, y, tipo='variable')
 logger.info('===================================================================================')
+
+
+## EXPORTACIÓN DE RESULTADOS
+# Valores de variables y restricciones en un archivo columnar (.npz)
+# El modelo es entero, así que no tiene duales ni costes reducidos: no se
+# declaran los sufijos m.dual y m.rc y las columnas 'dual' y 'rc' quedan a NaN.
+exportar_resultados(m, __file__[:-3] + '_Resultados.npz')
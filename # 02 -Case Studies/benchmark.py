@@ -0,0 +1,416 @@
+# ===================================================================== #
+#                     BENCHMARK DE LOS CASOS DE ESTUDIO                 #
+# ===================================================================== #
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pyomo
+from pyomo.environ import *
+
+'''
+Mide cuánto cuesta cada caso de estudio cuando crece el tamaño del problema.
+
+Los scripts de los casos de estudio tienen los datos escritos a mano o los
+leen de un Excel, así que aquí cada problema tiene:
+    - un generador de instancias aleatorias parametrizado por un tamaño n
+      (siempre con la misma semilla, para que las instancias se repitan)
+    - una función que construye el mismo modelo que el script original
+
+Para cada problema y tamaño se guardan por separado:
+    - construir_s:   tiempo de construcción del modelo de Pyomo
+    - escribir_s:    tiempo de escritura del archivo del solver (.lp)
+    - resolver_s:    tiempo de la llamada al solver. Con glpk incluye la
+                     escritura del .lp y la lectura de la solución; con un
+                     solver en memoria, el paso del modelo a su librería
+    - memoria_MB:    pico de memoria de Python al construir y escribir
+                     (tracemalloc, medido en una pasada aparte para no
+                     falsear los tiempos)
+
+Por defecto se resuelve con el solver en memoria (solver_memoria.py) o con
+glpk si no está instalado. Con --solver glpk se mide el camino por archivos
+para compararlo.
+
+Los resultados se escriben en un JSON para poder comparar entre versiones.
+
+Uso:
+    python benchmark.py
+    python benchmark.py --problemas asignacion tsp --tamanos 50 100 200
+    python benchmark.py --solver glpk
+    python benchmark.py --solver cbc --opciones seconds=60 --salida cbc.json
+    python benchmark.py --sin-resolver
+'''
+
+_carpeta = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(_carpeta, '# 02 - Set covering problem'))
+sys.path.append(os.path.join(_carpeta, '# 04 - Sudoku problem'))
+sys.path.append(os.path.join(_carpeta, '# 05 - Strip packing 2D problem'))
+
+from solver_memoria import solver_en_memoria
+
+
+# ===================================================================== #
+#                     GENERADORES Y MODELOS                             #
+# ===================================================================== #
+
+## ASIGNACIÓN (Assignment.py)
+# n personas y n trabajos con coeficientes de idoneidad entre 1 y 20
+def generar_asignacion(n, rng):
+    return {'CI': rng.integers(1, 21, size = (n, n))}
+
+
+def modelo_asignacion(datos):
+    n = datos['CI'].shape[0]
+    m = ConcreteModel(name = 'Assignation problem')
+    p = m.p = Set(initialize = ['p' + str(a) for a in range(n)], ordered = True)
+    t = m.t = Set(initialize = ['t' + str(b) for b in range(n)], ordered = True)
+    CI = m.CI = Param(p, t, initialize = dict(zip([(a, b) for a in p for b in t],
+                                                  datos['CI'].ravel().tolist())))
+    y = m.y = Var(p, t, domain = Binary)
+    m.R1 = Constraint(p, rule = lambda m, a: sum(y[a, b] for b in t) == 1)
+    m.R2 = Constraint(t, rule = lambda m, b: sum(y[a, b] for a in p) == 1)
+    m.OBJ = Objective(expr = sum(CI[a, b] * y[a, b] for a in p for b in t), sense = maximize)
+    return m
+
+
+## SET COVERING (Set_Covering.py)
+# n zonas repartidas en un cuadrado. Una planta da servicio a su zona y a
+# las zonas que están a menos de una distancia dada (unas 6 vecinas). Las
+# parejas se buscan con un índice espacial (cobertura_espacial.py)
+def generar_set_covering(n, rng):
+    from cobertura_espacial import vecinos_radio
+    xy = rng.random((n, 2))
+    radio = np.sqrt(6.0 / (np.pi * n))
+    indptr, indices = vecinos_radio(xy, xy, radio)
+    return {'indptr': indptr, 'indices': indices}
+
+
+def modelo_set_covering(datos):
+    indptr, indices = datos['indptr'], datos['indices']
+    n = len(indptr) - 1
+    m = ConcreteModel()
+    zonas = ['Zona ' + str(a + 1) for a in range(n)]
+    i = m.i = Set(initialize = zonas, ordered = True)
+    vecinos = {zonas[a]: [zonas[b] for b in indices[indptr[a]:indptr[a + 1]]] for a in range(n)}
+    N = m.N = Set(i, within = i, initialize = vecinos, ordered = True)
+    y = m.y = Var(i, within = Binary)
+    m.r1 = Constraint(i, rule = lambda m, a: sum(y[b] for b in N[a]) >= 1)
+    m.obj = Objective(expr = sum(y[a] for a in i), sense = minimize)
+    return m
+
+
+## MOCHILA (Knapsack.py)
+# n objetos con precio, volumen, peso y número de unidades aleatorios. Las
+# capacidades son una fracción de lo que ocupan todos los objetos
+def generar_mochila(n, rng):
+    N = rng.integers(1, 16, size = n)
+    V = rng.integers(1, 1001, size = n)
+    W = rng.integers(10, 2001, size = n)
+    return {'MP': rng.integers(1, 51, size = n), 'V': V, 'W': W, 'N': N,
+            'volumen': int(0.25 * (V * N).sum()), 'peso': int(0.25 * (W * N).sum())}
+
+
+def modelo_mochila(datos):
+    n = len(datos['MP'])
+    m = ConcreteModel(name = 'Knap-sack problem')
+    obj = m.obj = Set(initialize = ['Objeto ' + str(a + 1) for a in range(n)], ordered = True)
+    MP = m.MP = Param(obj, initialize = dict(zip(obj, datos['MP'].tolist())))
+    V = m.V = Param(obj, initialize = dict(zip(obj, datos['V'].tolist())))
+    W = m.W = Param(obj, initialize = dict(zip(obj, datos['W'].tolist())))
+    N = m.N = Param(obj, initialize = dict(zip(obj, datos['N'].tolist())))
+    y = m.y = Var(obj, domain = Binary)
+    n_ = m.n = Var(obj, domain = NonNegativeIntegers)
+    m.VolumeRule = Constraint(expr = sum(V[a] * n_[a] for a in obj) <= datos['volumen'])
+    m.WeightRule = Constraint(expr = sum(W[a] * n_[a] for a in obj) <= datos['peso'])
+    m.NumberRule = Constraint(obj, rule = lambda m, a: n_[a] <= N[a] * y[a])      # y[a] = 0 obliga a n[a] = 0
+    m.objective = Objective(expr = sum(MP[a] * n_[a] for a in obj), sense = maximize)
+    return m
+
+
+## SUDOKU (sudoku_problem.py)
+# Sudoku de n^2 x n^2 casillas (n = 3 es el clásico de 9x9). Se parte de
+# una solución válida con las filas y columnas barajadas y se vacía la mitad
+def generar_sudoku(n, rng):
+    nn = n * n
+    filas = np.concatenate([b * n + rng.permutation(n) for b in rng.permutation(n)])
+    columnas = np.concatenate([b * n + rng.permutation(n) for b in rng.permutation(n)])
+    base = (n * (filas[:, None] % n) + filas[:, None] // n + columnas[None, :]) % nn + 1
+    pistas = np.where(rng.random((nn, nn)) < 0.5, base, 0)
+    return {'pistas': pistas}
+
+
+def modelo_sudoku(datos):
+    from sudoku_batch import build_model
+    pistas = datos['pistas']
+    nn = pistas.shape[0]
+    row = ['r' + str(a + 1) for a in range(nn)]
+    column = ['c' + str(b + 1) for b in range(nn)]
+    m = build_model(row, column)
+    for a, b in zip(*np.nonzero(pistas)):
+        m.y[row[a], column[b], str(pistas[a, b])].fix(1)
+    return m
+
+
+## STRIP PACKING 2D (strip_packing_2D_problem.py, reformulación big-M)
+# n rectángulos de longitud entre 1 y 10 y altura entre 1 y el ancho W = 10
+def generar_strip_packing(n, rng):
+    return {'L': rng.integers(1, 11, size = n), 'H': rng.integers(1, 11, size = n), 'W': 10}
+
+
+def modelo_strip_packing(datos):
+    from strip_packing_heuristic import shelf_packing
+    n = len(datos['L'])
+    W = datos['W']
+    rect = ['R' + str(a + 1) for a in range(n)]
+    L = dict(zip(rect, datos['L'].tolist()))
+    H = dict(zip(rect, datos['H'].tolist()))
+
+    m = ConcreteModel(name = 'STRIP-PACKING 2D PROBLEM')
+    I = m.I = Set(initialize = rect, ordered = True)
+    pares = [(a, b) for ia, a in enumerate(rect) for b in rect[ia + 1:]]
+    P = m.P = Set(initialize = pares, dimen = 2, ordered = True)
+    PV = m.PV = Set(initialize = [(a, b) for (a, b) in pares if H[a] + H[b] <= W], dimen = 2, ordered = True)
+    PS = m.PS = Set(initialize = [(a, b) for (a, b) in pares if L[a] == L[b] and H[a] == H[b]], dimen = 2, ordered = True)
+    PH = m.PH = Set(initialize = [(a, b) for (a, b) in pares if not (L[a] == L[b] and H[a] == H[b])], dimen = 2, ordered = True)
+
+    x_heur, y_heur, L_heur = shelf_packing(rect, L, H, W)
+    lt = m.lt = Var(domain = NonNegativeReals, bounds = (0, L_heur))
+    x = m.x = Var(I, domain = NonNegativeReals, bounds = lambda m, a: (0, L_heur - L[a]))
+    y = m.y = Var(I, domain = NonNegativeReals, bounds = lambda m, a: (H[a], W))
+
+    m.objective_fcn = Objective(expr = lt, sense = minimize)
+    m.global_constraint = Constraint(I, rule = lambda m, a: lt >= x[a] + L[a])
+
+    w1 = m.w1 = Var(P, domain = Binary)
+    w2 = m.w2 = Var(PH, domain = Binary)
+    w3 = m.w3 = Var(PV, domain = Binary)
+    w4 = m.w4 = Var(PV, domain = Binary)
+    m.disjunction_1 = Constraint(P, rule = lambda m, a, b:
+        x[a] + L[a] <= x[b] + (x[a].ub + L[a] - x[b].lb) * (1 - w1[a, b]))
+    m.disjunction_2 = Constraint(PH, rule = lambda m, a, b:
+        x[b] + L[b] <= x[a] + (x[b].ub + L[b] - x[a].lb) * (1 - w2[a, b]))
+    m.disjunction_3 = Constraint(PV, rule = lambda m, a, b:
+        y[a] - H[a] >= y[b] - (y[b].ub - y[a].lb + H[a]) * (1 - w3[a, b]))
+    m.disjunction_4 = Constraint(PV, rule = lambda m, a, b:
+        y[b] - H[b] >= y[a] - (y[a].ub - y[b].lb + H[b]) * (1 - w4[a, b]))
+
+    def logic_proposition_rule(m, a, b):
+        w_ab = [w1[a, b]]
+        if (a, b) in PH:
+            w_ab.append(w2[a, b])
+        if (a, b) in PV:
+            w_ab += [w3[a, b], w4[a, b]]
+        return sum(w_ab) == 1
+    m.logic_proposition = Constraint(P, rule = logic_proposition_rule)
+    m.symmetry_breaking = Constraint(PS, rule = lambda m, a, b: x[a] <= x[b])
+    return m
+
+
+## TRANSPORTE (transportation_problem.py)
+# n plantas y n mercados con distancias entre 0.5 y 3 miles de millas. La
+# capacidad total supera a la demanda total en un 10%
+def generar_transporte(n, rng):
+    demanda = rng.integers(100, 501, size = n)
+    capacidad = rng.random(n)
+    capacidad = np.ceil(1.1 * demanda.sum() * capacidad / capacidad.sum())
+    return {'a': capacidad, 'b': demanda, 'd': np.round(rng.uniform(0.5, 3.0, size = (n, n)), 1)}
+
+
+def modelo_transporte(datos):
+    n = len(datos['a'])
+    m = ConcreteModel()
+    I = m.I = Set(initialize = ['planta' + str(a) for a in range(n)])
+    J = m.J = Set(initialize = ['mercado' + str(b) for b in range(n)])
+    m.a = Param(I, initialize = dict(zip(I, datos['a'].tolist())))
+    m.b = Param(J, initialize = dict(zip(J, datos['b'].tolist())))
+    m.d = Param(I, J, initialize = dict(zip([(a, b) for a in I for b in J], datos['d'].ravel().tolist())))
+    m.c = Param(I, J, initialize = lambda m, a, b: 90 * m.d[a, b] / 1000)
+    m.x = Var(I, J, domain = NonNegativeReals)
+    m.supply = Constraint(I, rule = lambda m, a: sum(m.x[a, b] for b in J) <= m.a[a])
+    m.demand = Constraint(J, rule = lambda m, b: sum(m.x[a, b] for a in I) >= m.b[b])
+    m.Cost = Objective(expr = sum(m.c[a, b] * m.x[a, b] for a in I for b in J), sense = minimize)
+    return m
+
+
+## VIAJANTE (TravelSales.py, sin cortes de ciclos)
+# n ciudades en un cuadrado. Cada ciudad está comunicada con sus 5 vecinas
+# más cercanas (en los dos sentidos) y el coste es la distancia
+def generar_tsp(n, rng):
+    xy = rng.random((n, 2)) * 100
+    d = np.sqrt(((xy[:, None, :] - xy[None, :, :]) ** 2).sum(axis = 2))
+    vecinas = np.argsort(d, axis = 1)[:, 1:min(n, 6)]
+    arcos = set()
+    for a in range(n):
+        for b in vecinas[a].tolist():
+            arcos.update([(a, b), (b, a)])
+    arcos = sorted(arcos)
+    return {'arcos': arcos, 'distancia': [round(float(d[a, b]), 1) for a, b in arcos]}
+
+
+def modelo_tsp(datos):
+    nombre = lambda a: 'C' + str(a)
+    arcos = [(nombre(a), nombre(b)) for a, b in datos['arcos']]
+    ciudades = sorted(set(a for a, b in arcos), key = lambda a: int(a[1:]))
+    sucesores = {a: [] for a in ciudades}
+    predecesores = {a: [] for a in ciudades}
+    for a, b in arcos:
+        sucesores[a].append(b)
+        predecesores[b].append(a)
+
+    m = ConcreteModel(name = 'Travel salesman problem')
+    c = m.c = Set(initialize = ciudades, ordered = True)
+    R = m.R = Set(initialize = arcos, dimen = 2, ordered = True)
+    Cf = m.Cf = Param(R, initialize = dict(zip(arcos, datos['distancia'])))
+    y = m.y = Var(R, domain = Binary)
+    m.r1 = Constraint(c, rule = lambda m, a: sum(y[a, b] for b in sucesores[a]) == 1)
+    m.r2 = Constraint(c, rule = lambda m, b: sum(y[a, b] for a in predecesores[b]) == 1)
+    m.obj = Objective(expr = sum(Cf[a, b] * y[a, b] for (a, b) in R), sense = minimize)
+    return m
+
+
+## MAQUINARIA (machinery_problem.py)
+# n tipos de máquina y n // 2 + 1 secciones de la fábrica
+def generar_maquinaria(n, rng):
+    s = n // 2 + 1
+    tiempo = rng.integers(1, 10, size = (n, s))
+    return {'profit': rng.integers(5, 21, size = n), 'tiempo': tiempo,
+            'max_time': (tiempo.sum(axis = 0) * rng.uniform(5, 20, size = s)).round()}
+
+
+def modelo_maquinaria(datos):
+    n, s = datos['tiempo'].shape
+    m = ConcreteModel()
+    M = m.M = Set(initialize = ['m' + str(a + 1) for a in range(n)], ordered = True)
+    S = m.S = Set(initialize = ['s' + str(b + 1) for b in range(s)], ordered = True)
+    profit = dict(zip(M, datos['profit'].tolist()))
+    max_time = dict(zip(S, datos['max_time'].tolist()))
+    time_x_section = dict(zip([(a, b) for a in M for b in S], datos['tiempo'].ravel().tolist()))
+    x = m.x = Var(M, within = NonNegativeIntegers)
+    m.value = Objective(expr = sum(profit[a] * x[a] for a in M), sense = maximize)
+    m.constraint = Constraint(S, rule = lambda m, b: sum(time_x_section[a, b] * x[a] for a in M) <= max_time[b])
+    return m
+
+
+# > Problema: (generador, modelo, tamaños por defecto)
+PROBLEMAS = {'asignacion':    (generar_asignacion,    modelo_asignacion,    [10, 50, 100]),
+             'set_covering':  (generar_set_covering,  modelo_set_covering,  [12, 50, 200]),
+             'mochila':       (generar_mochila,       modelo_mochila,       [10, 100, 1000]),
+             'sudoku':        (generar_sudoku,        modelo_sudoku,        [2, 3, 4]),
+             'strip_packing': (generar_strip_packing, modelo_strip_packing, [5, 8, 10]),
+             'transporte':    (generar_transporte,    modelo_transporte,    [10, 50, 100]),
+             'tsp':           (generar_tsp,           modelo_tsp,           [10, 50, 200]),
+             'maquinaria':    (generar_maquinaria,    modelo_maquinaria,    [4, 20, 100])}
+
+
+# ===================================================================== #
+#                     MEDICIONES                                        #
+# ===================================================================== #
+
+def medir(problema, n, solver = None, opciones = None, resolver = True, semilla = 0):
+    generar, modelo, _ = PROBLEMAS[problema]
+    datos = generar(n, np.random.default_rng(semilla))
+    fila = {'problema': problema, 'tamano': n}
+    archivo = os.path.join(tempfile.mkdtemp(), problema + '.lp')
+
+    # > Construcción y escritura del archivo del solver
+    inicio = time.perf_counter()
+    m = modelo(datos)
+    fila['construir_s'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    m.write(archivo, io_options = {'symbolic_solver_labels': False})
+    fila['escribir_s'] = time.perf_counter() - inicio
+    fila['archivo_MB'] = os.path.getsize(archivo) / 2**20
+    os.remove(archivo)
+
+    fila['variables'] = sum(1 for _ in m.component_data_objects(Var))
+    fila['restricciones'] = sum(1 for _ in m.component_data_objects(Constraint, active = True))
+
+    # > Resolución
+    fila['resolver_s'] = None
+    fila['estado'] = None
+    fila['objetivo'] = None
+    if resolver:
+        opt = SolverFactory(solver_en_memoria(alternativa = 'glpk') if solver is None else solver)
+        for clave, valor in (opciones or {}).items():
+            opt.options[clave] = valor
+        try:
+            inicio = time.perf_counter()
+            results = opt.solve(m, load_solutions = False)
+            fila['resolver_s'] = time.perf_counter() - inicio
+            fila['estado'] = str(results.solver.termination_condition)
+            if len(results.solution) > 0:
+                m.solutions.load_from(results)
+                fila['objetivo'] = value(next(m.component_data_objects(Objective, active = True)))
+        except Exception as e:
+            fila['estado'] = 'error: {0}'.format(e)
+    del m
+
+    # > Pico de memoria de Python al construir y escribir (pasada aparte)
+    tracemalloc.start()
+    m = modelo(datos)
+    m.write(archivo, io_options = {'symbolic_solver_labels': False})
+    fila['memoria_MB'] = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    os.remove(archivo)
+    os.rmdir(os.path.dirname(archivo))
+
+    return fila
+
+
+def _opciones(lista):
+    # 'clave=valor' -> {clave: valor}, con los números convertidos
+    opciones = {}
+    for opcion in lista:
+        clave, valor = opcion.split('=', 1)
+        try:
+            valor = float(valor) if '.' in valor else int(valor)
+        except ValueError:
+            pass
+        opciones[clave] = valor
+    return opciones
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Benchmark de los casos de estudio')
+    parser.add_argument('--problemas', nargs = '+', choices = sorted(PROBLEMAS), default = list(PROBLEMAS))
+    parser.add_argument('--tamanos', nargs = '+', type = int,
+                        help = 'tamaños de instancia (por defecto los de cada problema)')
+    parser.add_argument('--solver', default = solver_en_memoria(alternativa = 'glpk'),
+                        help = 'por defecto el solver en memoria o, si no hay, glpk')
+    parser.add_argument('--opciones', nargs = '*', default = [],
+                        help = 'opciones del solver como clave=valor, por ejemplo tmlim=60')
+    parser.add_argument('--sin-resolver', action = 'store_true', help = 'solo construir y escribir')
+    parser.add_argument('--semilla', type = int, default = 0)
+    parser.add_argument('--salida', default = 'benchmark.json')
+    args = parser.parse_args()
+
+    informe = {'fecha':   datetime.datetime.now().isoformat(timespec = 'seconds'),
+               'python':  platform.python_version(),
+               'pyomo':   pyomo.version.version,
+               'solver':  None if args.sin_resolver else args.solver,
+               'opciones': _opciones(args.opciones),
+               'semilla': args.semilla,
+               'resultados': []}
+
+    print('{0:15s} {1:>7s} {2:>10s} {3:>10s} {4:>10s} {5:>10s}  {6}'.format(
+          'problema', 'tamaño', 'construir', 'escribir', 'resolver', 'memoria', 'estado'))
+    for problema in args.problemas:
+        for n in args.tamanos or PROBLEMAS[problema][2]:
+            fila = medir(problema, n, args.solver, informe['opciones'],
+                         not args.sin_resolver, args.semilla)
+            informe['resultados'].append(fila)
+            print('{0:15s} {1:7d} {2:9.3f}s {3:9.3f}s {4:>10s} {5:8.1f}MB  {6}'.format(
+                  problema, n, fila['construir_s'], fila['escribir_s'],
+                  '-' if fila['resolver_s'] is None else '{0:.3f}s'.format(fila['resolver_s']),
+                  fila['memoria_MB'], fila['estado'] or ''))
+
+    with open(args.salida, 'w') as f:
+        json.dump(informe, f, indent = 2)
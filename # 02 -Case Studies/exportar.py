@@ -0,0 +1,123 @@
+# ===================================================================== #
+#                     EXPORTACIÓN DE RESULTADOS                         #
+# ===================================================================== #
+import numpy as np
+from pyomo.environ import *
+
+'''
+Exporta los resultados de un modelo resuelto a un archivo columnar para
+poder analizarlos sin tener que leer los logs de texto.
+
+En una sola pasada por el modelo se recogen en arrays de NumPy:
+    - tipo:        'variable' o 'restriccion'
+    - componente:  nombre de la componente (y, n, R1, ...)
+    - aridad:      número de posiciones del índice (0 si no tiene índice)
+    - indice_0, indice_1, ...: una columna por posición del índice
+    - valor:       valor de la variable o del cuerpo de la restricción
+    - rc:          coste reducido de la variable (sufijo m.rc)
+    - dual:        valor dual de la restricción (sufijo m.dual)
+
+Los costes reducidos y los duales solo se rellenan si el modelo tiene los
+sufijos de importación correspondientes, por ejemplo:
+    m.dual = Suffix(direction = Suffix.IMPORT)
+    m.rc   = Suffix(direction = Suffix.IMPORT)
+En otro caso se guardan como NaN.
+
+Cada posición del índice conserva su tipo: los índices numéricos se guardan
+como números y los de texto como texto, con NaN o '' en los elementos cuyo
+índice es más corto (ver aridad). El índice del elemento k es
+    tuple(columnas['indice_%d' % p][k] for p in range(columnas['aridad'][k]))
+Si en una misma posición hay tipos distintos (por ejemplo, y['A','B'] y el
+corte 1 de una ConstraintList) la columna es un array de objetos.
+
+Si el archivo termina en '.parquet' se escribe con pandas (necesita pyarrow
+o fastparquet). Como cada columna de parquet tiene un solo tipo, las
+columnas de objetos se guardan como texto. En cualquier otro caso se escribe
+un '.npz' comprimido que se lee con np.load(archivo, allow_pickle = True)
+(allow_pickle solo hace falta si hay columnas de objetos).
+'''
+
+
+def _indice(i):
+    # Índice del elemento como tupla: None -> (), 'Pedro' -> ('Pedro',)
+    if i is None:
+        return ()
+    if isinstance(i, tuple):
+        return i
+    return (i,)
+
+
+def _columna(valores):
+    # Array de una posición del índice con el tipo de sus valores. None marca
+    # los elementos cuyo índice no llega a esta posición
+    presentes = [v for v in valores if v is not None]
+    if all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in presentes):
+        if len(presentes) == len(valores):
+            return np.array(valores, dtype = np.int64)
+        return np.array([np.nan if v is None else v for v in valores], dtype = float)
+    if all(isinstance(v, (int, float, np.number)) and not isinstance(v, bool) for v in presentes):
+        return np.array([np.nan if v is None else v for v in valores], dtype = float)
+    if all(isinstance(v, str) for v in presentes):
+        return np.array(['' if v is None else v for v in valores], dtype = str)
+    columna = np.empty(len(valores), dtype = object)
+    columna[:] = valores
+    return columna
+
+
+def _indices(datos):
+    # Columnas aridad, indice_0, indice_1, ... de una lista de elementos
+    indices = [_indice(d.index()) for d in datos]
+    aridad = np.fromiter(map(len, indices), dtype = np.int64, count = len(indices))
+    columnas = {'aridad': aridad}
+    for p in range(aridad.max() if len(aridad) else 0):
+        columnas['indice_{0}'.format(p)] = _columna([i[p] if p < len(i) else None for i in indices])
+    return columnas
+
+
+def _valor(x):
+    # Las variables sin valor se guardan como NaN
+    x = value(x, exception = False)
+    return float('nan') if x is None else x
+
+
+def _sufijo(m, nombre, datos):
+    # Valores del sufijo para cada elemento, o NaN si el modelo no lo tiene
+    sufijo = m.component(nombre)
+    if not (isinstance(sufijo, Suffix) and sufijo.import_enabled()):
+        return np.full(len(datos), np.nan)
+    return np.array([sufijo.get(d, np.nan) for d in datos], dtype = float)
+
+
+def resultados(m):
+    # Se recorren las variables y restricciones una sola vez
+    variables = list(m.component_data_objects(Var, active = True))
+    restricciones = list(m.component_data_objects(Constraint, active = True))
+
+    tipo = ['variable'] * len(variables) + ['restriccion'] * len(restricciones)
+    componente = [v.parent_component().name for v in variables] + \
+                 [r.parent_component().name for r in restricciones]
+
+    valor = np.fromiter((_valor(v) for v in variables),
+                        dtype = float, count = len(variables))
+    actividad = np.fromiter((_valor(r.body) for r in restricciones),
+                            dtype = float, count = len(restricciones))
+
+    columnas = {'tipo':       np.array(tipo, dtype = str),
+                'componente': np.array(componente, dtype = str)}
+    columnas.update(_indices(variables + restricciones))
+    columnas.update({'valor': np.concatenate((valor, actividad)),
+                     'rc':    np.concatenate((_sufijo(m, 'rc', variables), np.full(len(restricciones), np.nan))),
+                     'dual':  np.concatenate((np.full(len(variables), np.nan), _sufijo(m, 'dual', restricciones)))})
+    return columnas
+
+
+def exportar_resultados(m, archivo):
+    columnas = resultados(m)
+    if archivo.endswith('.parquet'):
+        import pandas as pd
+        tabla = pd.DataFrame({nombre: columna.astype(str) if columna.dtype == object else columna
+                              for nombre, columna in columnas.items()})
+        tabla.to_parquet(archivo, index = False)
+    else:
+        np.savez_compressed(archivo, **columnas)
+    return columnas
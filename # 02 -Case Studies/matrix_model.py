@@ -0,0 +1,137 @@
+# ===================================================================== #
+#                     CONSTRUCCIÓN DEL MODELO EN FORMA MATRICIAL        #
+# ===================================================================== #
+import numpy as np
+from pyomo.environ import *
+from pyomo.core.expr.numeric_expr import LinearExpression
+
+'''
+Construye restricciones y objetivos lineales a partir de arrays de
+coeficientes en lugar de funciones regla.
+
+Una regla como
+
+    def constraint_rule(m, j):
+        return sum(time_x_section[i,j] * x[i] for i in M) <= max_time[j]
+
+busca cada coeficiente en un diccionario y construye la suma término a
+término con los operadores de Python. Aquí los coeficientes vienen en un
+array de NumPy o en una matriz dispersa de SciPy. Se pasa una sola vez a
+CSR y cada fila se convierte en una única LinearExpression hecha
+directamente con su trozo de los arrays CSR. No hay llamadas a reglas, ni
+búsquedas en diccionarios, ni términos nulos, ni sumas intermedias.
+
+    - linear_constraints(A, x, rows, lb, ub): lb <= A x <= ub, indexada por rows
+    - linear_objective(c, x, sense): c x
+    - matrix_model(A, b, c, ...): el modelo completo (sets, variables,
+      restricciones y objetivo) de   min/max c x  s.a.  A x <= / >= / == b
+
+Las variables x son una Var indexada (su orden da las columnas de A) o una
+lista de variables. Las cotas son un escalar, un array con un valor por
+fila o None.
+
+Uso:
+    import os, sys
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from matrix_model import linear_constraints, linear_objective
+
+    m.x = Var(M, within = NonNegativeReals)
+    m.constraint = linear_constraints(A, m.x, S, ub = max_time)
+    m.value = linear_objective(profit, m.x, sense = maximize)
+
+La Constraint y el Objective son componentes normales de Pyomo, así que se
+escriben, se resuelven y se consultan igual que los construidos con reglas.
+'''
+
+
+def _csr(A):
+    # (data, indices, indptr, shape) de un array denso o de una matriz dispersa de SciPy
+    if hasattr(A, 'tocsr'):
+        A = A.tocsr()
+        A.sum_duplicates()
+        return A.data.tolist(), A.indices.tolist(), A.indptr.tolist(), A.shape
+    A = np.atleast_2d(np.asarray(A, dtype = float))
+    rows, cols = np.nonzero(A)
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength = A.shape[0]))))
+    return A[rows, cols].tolist(), cols.tolist(), indptr.tolist(), A.shape
+
+
+def _columns(x):
+    # Variables en el orden de las columnas
+    return list(x.values()) if hasattr(x, 'values') else list(x)
+
+
+def _per_row(bound, n):
+    # Escalar o array de cotas -> lista con una cota por fila. None, NaN y
+    # +-inf significan que no hay cota
+    if bound is None or np.isscalar(bound):
+        bound = [bound] * n
+    bound = np.asarray(bound, dtype = float).ravel().tolist()
+    if len(bound) != n:
+        raise ValueError('Se esperaban {0} cotas, una por fila, y hay {1}'.format(n, len(bound)))
+    return [None if v != v or abs(v) == float('inf') else v for v in bound]
+
+
+def linear_constraints(A, x, rows = None, lb = None, ub = None, doc = None):
+    data, indices, indptr, shape = _csr(A)
+    x = _columns(x)
+    if len(x) != shape[1]:
+        raise ValueError('A tiene {0} columnas pero hay {1} variables'.format(shape[1], len(x)))
+    if rows is None:
+        rows = range(shape[0])
+    keys = list(rows)
+    if len(keys) != shape[0]:
+        raise ValueError('A tiene {0} filas pero hay {1} índices de fila'.format(shape[0], len(keys)))
+    lb = _per_row(lb, shape[0])
+    ub = _per_row(ub, shape[0])
+
+    # > Una LinearExpression por fila, directamente de los trozos CSR
+    variable = x.__getitem__
+    expressions = {}
+    for r, key in enumerate(keys):
+        start, end = indptr[r], indptr[r + 1]
+        body = LinearExpression(linear_coefs = data[start:end],
+                                linear_vars = list(map(variable, indices[start:end])))
+        if lb[r] is not None and lb[r] == ub[r]:
+            expressions[key] = (body, ub[r])
+        elif lb[r] is None and ub[r] is None:
+            expressions[key] = Constraint.Skip
+        else:
+            expressions[key] = (lb[r], body, ub[r])
+    return Constraint(rows if hasattr(rows, 'ctype') else keys, rule = expressions, doc = doc)
+
+
+def linear_objective(c, x, sense = minimize, constant = 0, doc = None):
+    x = _columns(x)
+    c = np.asarray(c, dtype = float).ravel()
+    if len(c) != len(x):
+        raise ValueError('c tiene {0} coeficientes pero hay {1} variables'.format(len(c), len(x)))
+    nonzero = np.flatnonzero(c)
+    return Objective(expr = LinearExpression(constant = constant,
+                                             linear_coefs = c[nonzero].tolist(),
+                                             linear_vars = [x[k] for k in nonzero.tolist()]),
+                     sense = sense, doc = doc)
+
+
+def matrix_model(A, b, c, rows = None, cols = None, row_sense = '<=', sense = minimize,
+                 within = NonNegativeReals, name = 'unknown'):
+    '''
+    min/max c x  s.a.  A x (row_sense) b,  x en within
+    row_sense es '<=', '>=' o '==' para todas las filas, o un array con uno por fila.
+    Componentes: cols, rows (Sets), x (Var), constraint (Constraint), objective.
+    '''
+    shape = A.shape if hasattr(A, 'shape') else np.shape(A)
+    b = np.broadcast_to(np.asarray(b, dtype = float), (shape[0],))
+    row_sense = np.broadcast_to(np.asarray(row_sense), (shape[0],))
+    if not np.isin(row_sense, ['<=', '>=', '==']).all():
+        raise ValueError("row_sense debe ser '<=', '>=' o '=='")
+    lb = np.where(row_sense == '<=', -np.inf, b)
+    ub = np.where(row_sense == '>=', np.inf, b)
+
+    m = ConcreteModel(name = name)
+    m.cols = Set(initialize = range(shape[1]) if cols is None else list(cols), ordered = True)
+    m.rows = Set(initialize = range(shape[0]) if rows is None else list(rows), ordered = True)
+    m.x = Var(m.cols, within = within)
+    m.constraint = linear_constraints(A, m.x, m.rows, lb = lb, ub = ub)
+    m.objective = linear_objective(c, m.x, sense = sense)
+    return m
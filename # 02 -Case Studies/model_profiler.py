@@ -0,0 +1,193 @@
+# ===================================================================== #
+#                     PERFILADO DE LA CONSTRUCCIÓN DEL MODELO           #
+# ===================================================================== #
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from pyomo.environ import *
+from pyomo.core.expr.visitor import sizeof_expression
+
+'''
+Mide dónde se va el tiempo al construir y resolver los modelos de los casos
+de estudio.
+
+Una vez enganchado a un ConcreteModel, cada componente que se declara en él
+(Set, Param, Var, Constraint, Objective, ...) se cronometra mientras se
+construye, así que se incluye el tiempo de su función regla. Para cada
+componente se guarda:
+    - el tiempo de construcción
+    - el número de elementos (índices) y de nodos de las expresiones (solo
+      restricciones y objetivos, contados fuera del cronómetro)
+    - la memoria reservada por Python (neta y pico, con tracemalloc)
+
+La llamada al solver se separa en escribir el archivo del problema, ejecutar
+el solver y cargar los resultados (para los solvers que se lanzan como
+programa externo, como glpk o cbc; los demás se cronometran enteros).
+Cualquier parte del script se puede cronometrar con profiler.section(nombre).
+
+Los registros se pueden imprimir como tabla o exportar como:
+    - traza de Chrome (chrome://tracing, https://ui.perfetto.dev, speedscope)
+    - pilas colapsadas para flamegraph.pl / speedscope
+
+Uso:
+    import os, sys
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from model_profiler import ModelProfiler
+    from solver_memoria import crear_solver_en_memoria
+
+    model = ConcreteModel()
+    profiler = ModelProfiler(model)
+    ...
+    profiler.solve(crear_solver_en_memoria(alternativa = 'glpk'), model)
+    profiler.report()
+    profiler.export_trace('profile.json')
+
+Con enabled = False no se instrumenta nada y profiler.solve solo llama al
+solver, así que el perfilador se puede dejar apagado en el script.
+'''
+
+
+class ModelProfiler(object):
+
+    def __init__(self, model = None, enabled = True, memory = True):
+        self.enabled = enabled
+        self.memory  = memory and enabled
+        self.records = []          # (pila, inicio, duración, info)
+        self._stack  = []
+        self._peaks  = []
+        self._origin = time.perf_counter()
+        self._model  = None
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if model is not None:
+            self.attach(model)
+
+    # > Cronómetro de un bloque de código. Los registros guardan el anidamiento
+    @contextmanager
+    def section(self, name, **info):
+        if not self.enabled:
+            yield info
+            return
+        self._stack.append(name)
+        if self.memory:
+            memory_0 = self._enter_memory()
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            duration = time.perf_counter() - start
+            if self.memory:
+                current, peak = self._exit_memory()
+                info['memory_MB'] = (current - memory_0) / 2**20
+                info['peak_MB'] = (peak - memory_0) / 2**20
+            self.records.append((tuple(self._stack), start - self._origin, duration, info))
+            self._stack.pop()
+
+    # > tracemalloc guarda un único pico. Se reinicia en cada sección y el pico
+    #   de una sección anidada se pasa a la que la contiene
+    def _enter_memory(self):
+        current, peak = tracemalloc.get_traced_memory()
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        self._peaks.append(current)
+        return current
+
+    def _exit_memory(self):
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(self._peaks.pop(), peak)
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        return current, peak
+
+    # > Las componentes se construyen al añadirlas a un ConcreteModel
+    def attach(self, model):
+        if not self.enabled:
+            return
+        add_component = model.add_component
+
+        def profiled_add_component(name, val):
+            with self.section(name) as info:
+                add_component(name, val)
+            component = model.component(name)
+            if component is not None:
+                info['type'] = component.ctype.__name__
+                info.update(_size(component))
+            return component
+
+        object.__setattr__(model, 'add_component', profiled_add_component)
+        self._model = model
+
+    def detach(self):
+        if self._model is not None:
+            object.__delattr__(self._model, 'add_component')
+            self._model = None
+
+    # > Llamada al solver. Los solvers externos se separan en write / solver / load
+    def solve(self, opt, model, **kwargs):
+        if not self.enabled:
+            return opt.solve(model, **kwargs)
+
+        steps = {'_presolve': 'write', '_apply_solver': 'solver', '_postsolve': 'load'}
+        wrapped = [step for step in steps if callable(getattr(opt, step, None))]
+        for step in wrapped:
+            def profiled_step(*args, _step = step, _method = getattr(opt, step), **kw):
+                with self.section(steps[_step]):
+                    return _method(*args, **kw)
+            setattr(opt, step, profiled_step)
+        try:
+            with self.section('solve', solver = getattr(opt, 'name', type(opt).__name__)):
+                return opt.solve(model, **kwargs)
+        finally:
+            for step in wrapped:
+                delattr(opt, step)
+
+    # ================================================================= #
+    #                     INFORMES                                      #
+    # ================================================================= #
+
+    def report(self, top = None):
+        records = sorted(self.records, key = lambda r: -r[2])[:top]
+        print('\n{0:40s} {1:>12s} {2:>10s} {3:>10s} {4:>10s} {5:>10s}'.format(
+              'component', 'type', 'time [s]', 'elements', 'expr nodes', 'mem [MB]'))
+        for stack, start, duration, info in records:
+            print('{0:40s} {1:>12s} {2:10.4f} {3:>10s} {4:>10s} {5:>10s}'.format(
+                  '/'.join(stack)[:40], info.get('type', ''), duration,
+                  str(info.get('elements', '')), str(info.get('expression_nodes', '')),
+                  '{0:.2f}'.format(info['memory_MB']) if 'memory_MB' in info else ''))
+
+    def export_trace(self, filename):
+        # Formato de traza de Chrome. Eventos completos ('X') con tiempos en microsegundos
+        events = [{'name': stack[-1], 'cat': info.get('type', 'section'), 'ph': 'X',
+                   'ts': start * 1e6, 'dur': duration * 1e6, 'pid': 0, 'tid': 0,
+                   'args': info}
+                  for stack, start, duration, info in self.records]
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def export_collapsed(self, filename):
+        # Una línea por pila con su tiempo propio en microsegundos:  a;b;c 1234
+        self_time = {}
+        for stack, start, duration, info in self.records:
+            self_time[stack] = self_time.get(stack, 0) + duration
+            if len(stack) > 1:
+                self_time[stack[:-1]] = self_time.get(stack[:-1], 0) - duration
+        with open(filename, 'w') as f:
+            for stack, duration in self_time.items():
+                f.write('{0} {1}\n'.format(';'.join(stack), max(int(duration * 1e6), 0)))
+
+
+def _size(component):
+    # Elementos de la componente y nodos de las expresiones de sus restricciones
+    info = {}
+    try:
+        info['elements'] = len(component)
+    except TypeError:
+        pass
+    if isinstance(component, (Constraint, Objective)):
+        info['expression_nodes'] = sum(sizeof_expression(data.expr)
+                                       for data in component.values())
+    return info
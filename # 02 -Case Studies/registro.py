@@ -0,0 +1,71 @@
+# ===================================================================== #
+#                     REGISTRO DE RESULTADOS                            #
+# ===================================================================== #
+import gzip
+import logging
+
+'''
+Funciones comunes para guardar en un archivo de log las restricciones,
+parámetros y valores de las variables de los casos de estudio.
+
+Cada elemento de una componente se escribe en su propia línea a medida que
+se recorre, así que nunca se construye el texto completo en memoria. Volcar
+un modelo con un millón de variables cuesta un tiempo lineal y una memoria
+constante. Con comprimir=True el log se escribe directamente en formato gzip.
+
+Uso desde un caso de estudio:
+
+    import os, sys
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from registro import crear_logger, archivar
+
+    logger = crear_logger(__name__, 'Resultados.log')
+    archivar(logger, m.y, tipo='variable')
+'''
+
+
+class GzipFileHandler(logging.FileHandler):
+    # Igual que FileHandler, pero el archivo se abre comprimido
+    def _open(self):
+        return gzip.open(self.baseFilename, self.mode + 't', encoding=self.encoding)
+
+
+def crear_logger(nombre, archivo, comprimir=False):
+    # Se crea el logger y se da el nivel
+    logger = logging.getLogger(nombre)
+    logger.setLevel(logging.INFO)
+    # Si el logger ya tenía archivos (se llama otra vez en el mismo proceso),
+    # se cierran y se quitan para no duplicar líneas ni dejar archivos abiertos
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    # Se crea el formateador
+    formatter = logging.Formatter('%(message)s')
+    # Se crea lo que tratará el archivo y se le asigna el formateador
+    if comprimir:
+        file_handler = GzipFileHandler(archivo + '.gz', mode='w', encoding='utf-8')
+    else:
+        file_handler = logging.FileHandler(archivo, mode='w')
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+    return logger
+
+
+def lineas(x, tipo='constraint'):
+    # Generador con la cabecera de la componente y una línea por índice
+    yield '\n{0}: {1} ----------------\n'.format(x, x.doc)
+    for i in x:
+        if tipo == 'constraint':
+            yield '{0}'.format(x[i].expr)
+        elif tipo == 'parameter':
+            yield '{0} = {1}'.format(i, x[i])
+        elif tipo == 'variable':
+            yield '{0} = {1}'.format(i, x[i].value)
+        elif tipo == 'set':
+            yield '{0} = {1}'.format(i, list(x[i]))
+
+
+def archivar(logger, x, tipo='constraint'):
+    # Se escribe línea a línea según se generan
+    for linea in lineas(x, tipo):
+        logger.info(linea)
@@ -0,0 +1,76 @@
+# ===================================================================== #
+#                     SOLVER EN MEMORIA                                 #
+# ===================================================================== #
+from pyomo.environ import *
+
+'''
+SolverFactory('glpk').solve(m) escribe el modelo en un archivo .lp temporal,
+lanza glpsol como otro proceso y lee la solución de un archivo de texto. Con
+modelos pequeños (mochila, asignación, maquinaria...) eso cuesta más que la
+propia optimización.
+
+Los solvers de EN_MEMORIA se llaman desde el propio proceso de Python: la
+matriz de restricciones se pasa a la librería del solver por su API de C y
+los valores de la solución se leen de vuelta sin archivos intermedios.
+    - 'appsi_highs': HiGHS a través de sus bindings de Python (highspy,
+                     pip install highspy). Resuelve LP y MILP, carga duales
+                     (m.dual) y costes reducidos (m.rc) y admite warmstart.
+                     Si se vuelve a resolver el mismo modelo, solo se le
+                     pasan al solver los cambios.
+
+solver_en_memoria(alternativa = 'glpk') devuelve el nombre del primero de
+EN_MEMORIA que esté instalado y, si no hay ninguno, el de la alternativa.
+crear_solver_en_memoria hace lo mismo y devuelve el solver ya creado:
+
+    import os, sys
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from solver_memoria import solver_en_memoria, crear_solver_en_memoria
+
+    opt = crear_solver_en_memoria(alternativa = 'glpk')
+    results = opt.solve(m)
+    resolver_mochila(m, solver = solver_en_memoria(alternativa = 'glpk'))
+
+Para usar un solver concreto (por ejemplo glpk, para comparar resultados) se
+llama a SolverFactory('glpk') como siempre.
+
+appsi deja a 0 el número de restricciones y de variables de la sección
+Problem de los resultados. El solver que devuelve crear_solver_en_memoria
+los rellena contando las del modelo, así que results.write() los muestra
+bien. Si solo se pasa el nombre (por ejemplo a resolver_mochila) y el motor
+acaba llamando al solver, esos dos números salen a 0.
+'''
+
+# > Solvers con interfaz en memoria, por orden de preferencia
+EN_MEMORIA = ('appsi_highs',)
+
+_disponibles = {}
+
+
+def solver_en_memoria(alternativa = 'glpk'):
+    for candidato in EN_MEMORIA:
+        if candidato not in _disponibles:
+            _disponibles[candidato] = SolverFactory(candidato).available(exception_flag = False)
+        if _disponibles[candidato]:
+            return candidato
+    return alternativa
+
+
+def _completar_problema(results, m):
+    # Número de restricciones y de variables que appsi no rellena
+    results.problem.number_of_constraints = m.nconstraints()
+    results.problem.number_of_variables = m.nvariables()
+
+
+def crear_solver_en_memoria(alternativa = 'glpk'):
+    nombre = solver_en_memoria(alternativa)
+    opt = SolverFactory(nombre)
+    if nombre in EN_MEMORIA:
+        solve = opt.solve
+
+        def solve_completo(model, *args, **kwargs):
+            results = solve(model, *args, **kwargs)
+            _completar_problema(results, model)
+            return results
+
+        opt.solve = solve_completo
+    return opt